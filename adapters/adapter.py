@@ -29,6 +29,41 @@
 import numpy as np
 from copy import copy
 
+def block_dtype(dtype, is_big_endian=False):
+    """ Returns the NumPy data type with the byte order of the transfer
+
+    :param dtype: The NumPy data type of the values
+    :param is_big_endian: True if the most significant byte is sent first
+    """
+    return np.dtype(dtype).newbyteorder('>' if is_big_endian else '<')
+
+def parse_binary_block(buffer, dtype=np.float32, is_big_endian=False):
+    """ Returns a numpy array of the values of the IEEE 488.2 binary block 
+    contained in buffer, without copy of the data (view on the buffer).
+    The bytes before the '#' are ignored (header of the response). Definite 
+    length blocks (#<n><length><data>) and indefinite length blocks 
+    (#0<data><LF>) are handled.
+
+    :param buffer: bytes or bytearray with the response of the instrument
+    :param dtype: The NumPy data type of the values
+    :param is_big_endian: True if the most significant byte is sent first
+    :returns: NumPy array of values
+    """
+    dtype = block_dtype(dtype, is_big_endian)
+    start = buffer.find(b'#')
+    if start < 0:
+        raise ValueError("No IEEE 488.2 binary block in the response")
+    n = int(buffer[start + 1:start + 2])
+    if n == 0:
+        offset = start + 2
+        length = len(buffer) - offset
+        if buffer[-1:] == b'\n':
+            length -= 1
+    else:
+        offset = start + 2 + n
+        length = int(buffer[start + 2:offset])
+    return np.frombuffer(buffer, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
 class Adapter(object):
     """ Base class for Adapter child classes, which adapt between the Instrument 
     object and the connection, to allow flexible use of different connection 
@@ -96,6 +131,26 @@ class Adapter(object):
         raise NameError("Adapter (sub)class has not implemented the "
                         "binary_values method")
 
+    def read_raw(self):
+        """ Reads until the buffer is empty and returns the resulting
+        binary response
+
+        :returns: Bytes of the response of the instrument.
+        """
+        raise NameError("Adapter (sub)class has not implemented raw reading")
+
+    def binary_block(self, command, dtype=np.float32, is_big_endian=False):
+        """ Returns a numpy array from a query returning an IEEE 488.2 
+        binary block (#<n><length><data>), see parse_binary_block
+
+        :param command: SCPI command to be sent to the instrument
+        :param dtype: The NumPy data type of the values
+        :param is_big_endian: True if the most significant byte is sent first
+        :returns: NumPy array of values
+        """
+        self.write(command)
+        return parse_binary_block(self.read_raw(), dtype, is_big_endian)
+
 
 class FakeAdapter(Adapter):
     """Provides a fake adapter for debugging purposes,
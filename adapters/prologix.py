@@ -28,6 +28,7 @@
 
 import time
 import serial
+import numpy as np
 from .serial import SerialAdapter
 
 class PrologixAdapter(SerialAdapter):
@@ -89,6 +90,29 @@ class PrologixAdapter(SerialAdapter):
             time.sleep(self.rw_delay)
         return self.read()
 
+    def read_raw(self):
+        """ Reads the binary response of the instrument until timeout
+
+        :returns: Bytes of the response of the instrument
+        """
+        self.write("++read eoi")
+        return super().read_raw()
+
+    def binary_block(self, command, dtype=np.float32, is_big_endian=False):
+        """ Returns a numpy array from a query returning an IEEE 488.2 
+        binary block, see SerialAdapter.read_binary_block
+
+        :param command: SCPI command to be sent to the instrument
+        :param dtype: The NumPy data type of the values
+        :param is_big_endian: True if the most significant byte is sent first
+        :returns: NumPy array of values
+        """
+        self.write(command)
+        if self.rw_delay is not None:
+            time.sleep(self.rw_delay)
+        self.write("++read eoi")
+        return self.read_binary_block(dtype, is_big_endian)
+
     def write(self, command):
         """ Writes the command to the GPIB address stored in the
         :attr:`.address`
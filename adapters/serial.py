@@ -32,7 +32,7 @@ log.addHandler(logging.NullHandler())
 
 import serial
 import numpy as np
-from .adapter import Adapter
+from .adapter import Adapter, block_dtype, parse_binary_block
 
 class SerialAdapter(Adapter):
     """ Adapter class for using the Python Serial package to allow
@@ -47,6 +47,8 @@ class SerialAdapter(Adapter):
             self.connection = port
         else:
             self.connection = serial.Serial(port, **kwargs)
+        # receive buffer of the binary blocks, reused from one read to the next
+        self.buffer = bytearray()
 
     def __del__(self):
         """ Ensures the connection is closed upon deletion
@@ -76,10 +78,91 @@ class SerialAdapter(Adapter):
         :param dtype: The NumPy data type to format the values with
         :returns: NumPy array of values
         """
-        self.connection.write(command.encode())
-        binary = self.connection.read().decode()
-        header, data = binary[:header_bytes], binary[header_bytes:]
-        return np.fromstring(data, dtype=dtype)
+        self.write(command)
+        binary = b"".join(self.connection.readlines())
+        return np.frombuffer(binary[header_bytes:], dtype=dtype).copy()
+
+    def read_raw(self, termination=b'\n'):
+        """ Reads a binary response. An IEEE 488.2 definite length block is 
+        read with its length, without waiting for the timeout, the other 
+        responses are read until the termination.
+
+        :param termination: Bytes sent by the instrument at the end of the response
+        :returns: Bytes of the response of the instrument (without the termination
+            of a definite length block)
+        """
+        head, n, length = self.read_block_header(termination)
+        if length is None:
+            return head
+        data = self.connection.read(length)
+        if len(data) < length:
+            raise ValueError("Binary block shorter than its length")
+        self.connection.read(len(termination))
+        return head + b'%0*d' % (n, length) + data
+
+    def binary_block(self, command, dtype=np.float32, is_big_endian=False):
+        """ Returns a numpy array from a query returning an IEEE 488.2 
+        binary block. The data of a definite length block are read 
+        directly in the returned array.
+
+        :param command: SCPI command to be sent to the instrument
+        :param dtype: The NumPy data type of the values
+        :param is_big_endian: True if the most significant byte is sent first
+        :returns: NumPy array of values
+        """
+        self.write(command)
+        return self.read_binary_block(dtype, is_big_endian)
+
+    def read_block_header(self, termination=b'\n'):
+        """ Reads the response until the header of an IEEE 488.2 binary block
+
+        :param termination: Bytes sent by the instrument at the end of the response
+        :returns: (bytes read, number of digits of the length, length of the data). 
+            The length is None if the response is not a definite length block, the 
+            bytes read are then the whole response.
+        """
+        head = bytearray()
+        while not head.endswith(b'#'):
+            byte = self.connection.read(1)
+            head += byte
+            if byte == b'' or head.endswith(termination):
+                return bytes(head), None, None
+        n = self.connection.read(1)
+        head += n
+        if n in (b'', b'0'):
+            # indefinite length block : data until the termination
+            return bytes(head + self.connection.read_until(termination)), 0, None
+        n = int(n)
+        return bytes(head), n, int(self.connection.read(n))
+
+    def read_binary_block(self, dtype=np.float32, is_big_endian=False, termination=b'\n'):
+        """ Reads an IEEE 488.2 binary block and returns a numpy array of its values.
+        The data of a definite length block are received in the buffer of the 
+        adapter (reused from one block to the next) and copied once in the array.
+
+        :param dtype: The NumPy data type of the values
+        :param is_big_endian: True if the most significant byte is sent first
+        :param termination: Bytes sent by the instrument after the block
+        :returns: NumPy array of values
+        """
+        head, n, length = self.read_block_header(termination)
+        if n is None:
+            raise ValueError("No IEEE 488.2 binary block in the response")
+        if length is None:
+            return parse_binary_block(head, dtype, is_big_endian).copy()
+        dtype = block_dtype(dtype, is_big_endian)
+        if len(self.buffer) < length:
+            self.buffer = bytearray(length)
+        view = memoryview(self.buffer)
+        received = 0
+        while received < length:
+            count = self.connection.readinto(view[received:length])
+            if not count:
+                raise ValueError("Binary block shorter than its length")
+            received += count
+        # termination character
+        self.connection.read(len(termination))
+        return np.frombuffer(self.buffer, dtype=dtype, count=length // dtype.itemsize).copy()
 
     def __repr__(self):
         return "<SerialAdapter(port='%s')>" % self.connection.port
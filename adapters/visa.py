@@ -35,7 +35,7 @@ import copy
 import pyvisa as visa
 import numpy as np
 from pkg_resources import parse_version
-from .adapter import Adapter
+from .adapter import Adapter, block_dtype
 from threading import Lock
 
 # noinspection PyPep8Naming,PyUnresolvedReferences
@@ -152,8 +152,40 @@ class VISAAdapter(Adapter):
         self.connection.write(command)
         binary = self.connection.read_raw()
         self.lock.release()
-        header, data = binary[:header_bytes], binary[header_bytes:]
-        return np.fromstring(data, dtype=dtype)
+        return np.frombuffer(binary[header_bytes:], dtype=dtype).copy()
+
+    def read_raw(self):
+        """ Reads until the end of the message and returns the resulting
+        binary response
+
+        :returns: Bytes of the response of the instrument.
+        """
+        self.lock.acquire()
+        ans=self.connection.read_raw()
+        self.lock.release()
+        return(ans)
+
+    def binary_block(self, command, dtype=np.float32, is_big_endian=False):
+        """ Returns a numpy array from a query returning an IEEE 488.2 
+        binary block. The block is read with its length (termination 
+        characters inside the data are ignored) and the values are a view 
+        on the received bytes.
+
+        :param command: SCPI command to be sent to the instrument
+        :param dtype: The NumPy data type of the values
+        :param is_big_endian: True if the most significant byte is sent first
+        :returns: NumPy array of values
+        """
+        dtype = block_dtype(dtype, is_big_endian)
+        formats = {('f', 4): 'f', ('f', 8): 'd', ('i', 1): 'b', ('u', 1): 'B', ('i', 2): 'h',
+                   ('u', 2): 'H', ('i', 4): 'i', ('u', 4): 'I', ('i', 8): 'q', ('u', 8): 'Q'}
+        self.lock.acquire()
+        try:
+            ans=self.connection.query_binary_values(command, datatype=formats[(dtype.kind, dtype.itemsize)],
+                                                    is_big_endian=is_big_endian, container=np.array)
+        finally:
+            self.lock.release()
+        return(ans)
 
     def config(self, is_binary=False, datatype='str',
                container=np.array, converter='s',
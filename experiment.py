@@ -26,8 +26,11 @@
 import logging
 import time
 import os
+import json
 import numpy as np
+import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from queue import Queue
 from threading import Thread, Event
 from IPython import get_ipython
@@ -36,9 +39,11 @@ import gzip,bz2,lzma
 import panel as pn
 
 from .experiment_interface import Panel_Interface_Exp,Panel_message,Plotter_Button,Monitor_Interface,Spy_Interface
-from pymeso.utils import Measurement,Spy,myTimer,Sweep,Data_Saver,ExperimentError,Plotter,Alias
-from pymeso.utils import LinSweep,FlySweep,ArraySteps
+from pymeso.utils import Measurement,Measurement_Pipeline,Spy,myTimer,Sweep,Data_Saver,Data_Buffer,ExperimentError,Plotter,Alias
+from pymeso.utils import LinSweep,FlySweep,ArraySteps,LinSteps,LogSteps,AdaptiveSteps
 from pymeso.utils import Plotter_in_Notebook
+from pymeso.utils.data_file import h5py
+from pymeso.utils.async_engine import Async_Engine,run_multisweep
 
 class Experiment(object):
     """
@@ -49,12 +54,26 @@ class Experiment(object):
             - init_wait : time before stepper (in seconds).Ex : exp.init_wait=1.0
             - path : path to save the data files. Default = current directory(./)
             - measure : measured quantities, defined via a python dictionnary
+              Slow quantities can be cached with a time to live in seconds (see Measurement).
+              Ex : exp.measure={'X':[lockin,'x'],'T':[ls,'temp1',{'ttl':2.0}]}
+            - saver_options : options of the Data_Saver used to write the data files. 
+              Ex : exp.saver_options={'buffered':True,'buffer_size':500,'flush_time':2.0}
+                   exp.saver_options={'maxsize':10000,'policy':'spill'}
+                   exp.saver_options={'shared':True}    # all the files written by one thread
+            - memory_rows : maximum number of rows of the last multisweep kept in memory (exp.data 
+              and the plots). For a longer multisweep only the last memory_rows rows are kept and the 
+              plots read the file. 0 to keep the data only in the file. Default : 1000000
+            - executor : pool of threads reading the instruments, shared by the sweeps, 
+              the monitor and the spy. Its size is set by Experiment(max_workers=32)
+            - latency : histograms of the read durations of each instrument during the 
+              multisweeps and get_measure. Ex : exp.latency_histograms()
         
         METHODS :   
             move, sweep, multisweep, record, wait
             batch_line : execute commands from a string
             batch_file : execute commands from a file
             spy : display values of chosen devices
+            latency_histograms : statistics of the read durations of the instruments
 
         EXAMPLES:
             from pymeso import Experiment
@@ -64,15 +83,23 @@ class Experiment(object):
 
     """
     
-    def __init__(self,wait_time=1.0,init_wait=1.0,measure={},path='./',logfile='experiment_logfile.log',panel_server=True,panel_port=5009):
+    def __init__(self,wait_time=1.0,init_wait=1.0,measure={},path='./',logfile='experiment_logfile.log',panel_server=True,panel_port=5009,max_workers=32):
         """
             Initialisation
         """
+        # executor shared by the measurements (sweeps, monitor, spy)
+        self.executor=ThreadPoolExecutor(max_workers=max_workers)
         self.wait_time = wait_time 
         self.init_wait = init_wait 
         self.path = path
         self.lock_device=[]
         self._measure={}
+        self.saver_options={}
+        # in-memory copy of the data of the last multisweep (at most memory_rows rows)
+        self.memory_rows=1000000
+        self._data_buffer=None
+        # histograms of the read durations {instrument:Latency_Histogram}
+        self.latency={}
         
         # define the ipython shell and launch line interpreter with globals
         self.ip=get_ipython()
@@ -101,7 +128,7 @@ class Experiment(object):
             self.panel_plotter=pn.Column('# PYMESO PLOTTER')
             self.panel_plotter.append(Plotter_Button().start())
             # self.panel_server.append(Plotter_Button().start())
-            self._monitor=Monitor_Interface()
+            self._monitor=Monitor_Interface(executor=self.executor)
             self.panel_monitor.append(self._monitor.monitor_panel)
             tabs = pn.Tabs(('PROCESS',self.panel_server),
                            ('MONITOR',self.panel_monitor),
@@ -192,6 +219,16 @@ class Experiment(object):
         except:
             Panel_message('Error: ','bad format of the dictionnary')
             
+    @property
+    def data(self):
+        """
+            Return a dataframe with the data of the last multisweep, read from memory 
+            (the last memory_rows rows, None if memory_rows is 0)
+        """
+        if self._data_buffer==None:
+            return(None)
+        return(self._data_buffer.to_dataframe())
+        
     @property
     def path(self):
         return(self._path)
@@ -283,22 +320,26 @@ class Experiment(object):
             os.rename(temp_file,temp_file+'.saved'+dt_string)
         return temp_file
         
-    def write_to_file(self,file,content):
+    def write_to_file(self,file,content,data=None,append=False):
         """
             Internal function :
-            Write the content in the file using the compression format depending on the 
-            extension of the file ( ‘.gz’, ‘.bz2’, ‘.xz’, ...)
+            Write the content, followed by the dataframe data in csv, in the file using the 
+            compression format depending on the extension of the file ( ‘.gz’, ‘.bz2’, ‘.xz’, ...).
+            Everything is written through the same handle (a single compressed stream). 
+            If append is True, they are added at the end of the file without the csv header.
         """
         file_handler={'gz':gzip.open,'bz2':bz2.open,'xz':lzma.open}
-        extension=file.split('.')[-1]
+        extension=str(file).split('.')[-1]
+        mode_open='a' if append else 'w'
         if extension in ('gz','bz2','xz'):
             file_open=file_handler[extension]
-            mode_open='wt'
+            mode_open+='t'
         else:
             file_open=open
-            mode_open='w'
         with file_open(file, mode_open) as f:
             f.write(content)
+            if data is not None:
+                data.to_csv(f,index=False,header=not(append))
                    
     def config(self,measure,config_list,comment=None):
         """
@@ -613,17 +654,36 @@ class Experiment(object):
             thread_work_batch = Thread(name='Batch',target=self.work_batch,args=(task_list,interface,finish_function,set_function))
             thread_work_batch.start()
     
-    def measure_data_to_queue(self,measure_func,q,wait_time,wait=True):
+    def measure_data_to_queue(self,measure_func,q,wait_time,wait=True,steppers=None,pipeline=None):
         """
             Internal function :
-            Measure the data define by the measure function and put it in the queue q
+            Measure the data define by the measure function and put it in q (queue or Data_Saver).
+            If steppers is provided, the indices of the steppers are put with the data
+            as a checkpoint for the journal of the Data_Saver, and the data are given to the 
+            steppers with an observe method (AdaptiveSteps).
+            If pipeline (Measurement_Pipeline) is provided, the function returns once the 
+            setpoints are read and the data are put in q by the pipeline.
         """
         # wait before taking the data
         if wait:
             time.sleep(wait_time)
+        checkpoint=None
+        if steppers!=None:
+            checkpoint={'index':[stepper.sweep_index for stepper in steppers],
+                        'forward':[stepper.forward for stepper in steppers]}
+        if pipeline!=None:
+            pipeline.submit(q,checkpoint)
+            return
         # take the data
         df=measure_func.take()
-        q.put(df)
+        if steppers!=None:
+            for stepper in steppers:
+                if hasattr(stepper,'observe'):
+                    stepper.observe(df)
+        if checkpoint==None:
+            q.put(df)
+        else:
+            q.put((df,checkpoint))
     
     def check_nolock_device(self,instru,device):
         """
@@ -664,36 +724,34 @@ class Experiment(object):
         """
         self.lock_device=[]
         
-    def check_and_wait(self,interface,instru_sweep):
+    def check_and_wait(self,interface,instru_sweep,timeout=0.1):
         """
-            Internal function : check pause and stop then wait a little
+            Internal function : check pause and stop then wait the end of the step 
+            of instru_sweep (at most timeout in s). The wait returns as soon as the 
+            step is done for steppers providing wait_idle.
         """
         while interface.should_pause.is_set():
             instru_sweep.pause(True)
-            if interface.should_stop.is_set():
+            if interface.should_stop.wait(0.1):
                 break
-            time.sleep(0.1)
         if interface.should_stop.is_set():
             instru_sweep.stop()
             return(True)
         else: 
             instru_sweep.pause(False)
-            time.sleep(0.1)
+            try:
+                instru_sweep.wait_idle(timeout)
+            except AttributeError:
+                time.sleep(timeout)
             return(False)
     
     def wait_while_checking_stop(self,wait,interface,instru_sweep):
         """
             Internal function : wait a given time (in s) while checking stop button
         """
-        stopped_action=False
-        t0=time.time()
-        while (time.time()-t0) < wait:
-            if interface.should_stop.is_set():
-                instru_sweep.stop()
-                stopped_action=True
-                break
-            else: 
-                time.sleep(0.01)
+        stopped_action=interface.should_stop.wait(wait)
+        if stopped_action:
+            instru_sweep.stop()
         return(stopped_action)
 
     def work_stepper(self,instru_sweep,
@@ -768,8 +826,12 @@ class Experiment(object):
                     break
             interface.set_stepper_value(name,instru_sweep.interface_value)
         
-        # indicate that the current stepper is finished
+        # indicate that the current stepper is finished and stop its worker threads
         interface.step_dict[name]['finished']=True
+        try:
+            instru_sweep.shutdown()
+        except AttributeError:
+            pass
         # Close the interface if all the steppers have finished
         if self.steppers_finished(interface):
             # Close the objects in the to_close list
@@ -906,6 +968,7 @@ class Experiment(object):
             - comment : add the comment provided by the user to the header of the file
             - append : append value to an existing files without putting column label. Default : False
             - tolerance : don't go to initial value if current value is equal to start within tolerance. Default : 0.0
+            - file_format : format of the file, 'csv' or 'hdf' (chunked binary file, requires h5py). Default : 'csv'
             
             The device can be indicated in different forms :
             - 'device', if this is defined as an alias. The label in the file will be 'device'.
@@ -955,7 +1018,7 @@ class Experiment(object):
                             overwrite=overwrite,format=format,measure=measure,
                             wait_time=wait_time,batch=batch,interface=interface,
                             plotter=plotter,config_info=config_info,run=run,
-                            comment=comment,append=append)
+                            comment=comment,append=append,file_format=file_format)
        
     def multisweep(self,stepper_list,file,
         overwrite=False, format='line', 
@@ -963,12 +1026,13 @@ class Experiment(object):
         wait_time=None,
 		batch=False, interface=None, 
         plotter=None, config_info=None,
-        run=True,comment=None,append=False):
+        run=True,comment=None,append=False,file_format='csv',journal=False,timestamps=False,
+        pipeline=False,average=1,engine='thread'):
         """          
             Multi-sweep using a list of sweeps defined in stepper_list and save it to a file 'file'. If the file extension is .gz, .bz2 or .xz, the file is automatically compressed with the corresponding algorithm.
 
             The stepper_list has the forms [sweep0,sweep1,...] where sweep0,sweep1,...
-            are sweeps of type LinSweeps,LinSteps,LogSteps,ArraySteps.
+            are sweeps of type LinSweeps,LinSteps,LogSteps,ArraySteps,AdaptiveSteps.
             
             OPTIONS :
             - overwrite : If True overwrites the file, otherwise the old file is renamed. Default : False
@@ -982,6 +1046,28 @@ class Experiment(object):
             - wait : if True, wait the wait_time before doing the measurement. Default : True
             - comment : string provided by the user that will be inserted in the header of the file
             - append : append value to an existing files without putting column label. Default : False
+            - file_format : format of the file. Default : 'csv'
+                - 'csv' : text file with the header as comment lines
+                - 'hdf' : hdf file (requires h5py), each column is an extendable typed dataset and the header is an attribute.
+                  With the format 'line', tabular data are stored as 2D datasets (points x samples).
+            - journal : if True, the steppers and the last saved point are written in the file file+'.journal',
+              which allows to continue the multisweep with exp.resume(file) after a crash. 
+              The steppers should be of type LinSweep, LinSteps, LogSteps or ArraySteps. Default : False
+            - timestamps : if True, the columns key_start and key_end with the time.monotonic() values 
+              at the start and the end of the read of each measured key are added. Default : False
+            - pipeline : if True, the readout of the quantities with the option {'pipeline':True} 
+              (ex : {'X':[lockin,'buffer_x',{'pipeline':True}]}) is done in the background while the 
+              steppers move to the next point and wait. The other quantities are read before the move : 
+              use the option only for quantities latched or buffered by the instrument at the point 
+              (see Measurement_Pipeline). Default : False
+            - average : number of reads averaged at each point for the measured quantities without their 
+              own option (ex : {'X':[lockin,'x',{'average':10,'raw':True}]}). The columns key_std, key_min 
+              and key_max are added for the averaged quantities (see Measurement). Default : 1
+            - engine : execution engine of the multisweep. Default : 'thread'
+                - 'thread' : each stepper is run in its own thread
+                - 'async' : the steppers and the measurements are driven by a coroutine in the 
+                  process-wide event loop (see Async_Engine), the instruments are accessed through 
+                  the executor of the experiment. Not available for FlySweep and with pipeline.
             
             EXAMPLES :
                 step_heater=LinSteps([test,'dac3'],0,1,5,15,name='Heater')
@@ -1002,6 +1088,23 @@ class Experiment(object):
             wait_time=self.wait_time
         # define the batch mode
         batch_mode=batch
+        
+        # validate file format
+        if file_format not in ('csv','hdf'):
+            error=True
+            self.handle_error(ExperimentError('File format should be csv or hdf.'),batch)
+        elif file_format=='hdf' and h5py==None:
+            error=True
+            self.handle_error(ExperimentError('The h5py package is required for the hdf file format.'),batch)
+        
+        # validate the engine
+        if not(error) and engine not in ('thread','async'):
+            error=True
+            self.handle_error(ExperimentError('Engine should be thread or async.'),batch)
+        elif not(error) and engine=='async':
+            if pipeline or any(stepper.type=='FlySweep' for stepper in stepper_list):
+                error=True
+                self.handle_error(ExperimentError('The async engine is not available for FlySweep and with pipeline.'),batch)
 
         # validate measure
         try:
@@ -1036,6 +1139,28 @@ class Experiment(object):
                     self.handle_error(ExperimentError('Duplicate device in the stepper list.'),batch)
                     break
         
+        # validate the adaptive steppers, their data are provided by measure_data_to_queue
+        adaptive=[stepper for stepper in stepper_list if hasattr(stepper,'observe')]
+        if not(error) and adaptive:
+            if pipeline:
+                error=True
+                self.handle_error(ExperimentError('Adaptive steppers are not available with pipeline.'),batch)
+            elif any(not(stepper.column in local_measure or stepper.column in list_name) for stepper in adaptive):
+                error=True
+                self.handle_error(ExperimentError('The column of an adaptive stepper is not measured.'),batch)
+        
+        # validate the journal
+        journal_info=None
+        if not(error) and journal:
+            try:
+                journal_info=self.journal_info(stepper_list,{'wait_time':wait_time,'wait':wait,
+                                                'format':format,'file_format':file_format,
+                                                'timestamps':timestamps,'pipeline':pipeline,
+                                                'average':average})
+            except ExperimentError as exception:
+                error=True
+                self.handle_error(exception,batch)
+        
         # validate total measure list
         if not(error):
             device_dict_list=[]
@@ -1067,25 +1192,63 @@ class Experiment(object):
                     config_list+=[[stepper_list[i].generate_info()]]
                 except:
                     pass
-            config_list+=[[{'wait_time':wait_time,'wait':wait,'format':format,'overwrite':overwrite},]]
-            # write only if append is False 
-            if not(append):
-                self.write_to_file(file,self.config(measure,config_list,comment=comment))
+            config_list+=[[{'wait_time':wait_time,'wait':wait,'format':format,'overwrite':overwrite,
+                            'file_format':file_format,'timestamps':timestamps,'pipeline':pipeline,
+                            'average':average},]]
+            # the header is written by the Data_Saver only if append is False 
+            header=self.config(measure,config_list,comment=comment)
             if config_info==None:
                 config_info=['Multisweep','Sweeps: {}, File :{}'.format(Nstepper,file)]
-            self.logger.info('\n{}# FILE : {}\n'.format(self.config(measure,config_list,comment=comment),file))
+            self.logger.info('\n{}# FILE : {}\n'.format(header,file))
+            
+            # Create the in-memory buffer of the data sized for the full multisweep, 
+            # only the last memory_rows rows are kept for a longer multisweep
+            Npoints=1
+            for i in range(Nstepper):
+                try:
+                    Npoints*=len(stepper_list[i].sweep_values)
+                except:
+                    pass
+            if self.memory_rows>0:
+                maxlen=self.memory_rows if Npoints>self.memory_rows else None
+                self._data_buffer=Data_Buffer(size=min(Npoints,self.memory_rows),maxlen=maxlen)
+            else:
+                self._data_buffer=None
+            # the plots read the file in append mode (the previous data are only in the file) 
+            # or if the buffer does not keep all the data
+            if append or self._data_buffer==None or self._data_buffer.maxlen!=None:
+                interface.data_buffer=None
+            else:
+                interface.data_buffer=self._data_buffer
             
             # Create one Data_Saver object 
-            data_saver=Data_Saver(temp_file,append=append)
+            data_saver=Data_Saver(temp_file,file_format=file_format,append=append,header=header,
+                                  data_buffer=self._data_buffer,journal=journal_info,**self.saver_options)
+            interface.create_saver_monitor(data_saver)
             
-            # Create one Measurement object
-            measure_function=Measurement(measure,format=format)
+            # Create one Measurement object, the 'line' data are encoded as NumPy records
+            measure_function=Measurement(measure,format=format,record=True,executor=self.executor,
+                                         timestamps=timestamps,latency=self.latency,average=average,
+                                         setpoints=list_name)
             
             # Create the list of objects to stop at the end of the stepper
             to_stop=[data_saver,measure_function]     
 
             # Generate the list of arg and kwargs to launch the stepper
-            action=[self.measure_data_to_queue,(measure_function,data_saver.q,wait_time),{}]
+            kwargs={}
+            if journal or adaptive:
+                kwargs['steppers']=stepper_list
+            if pipeline:
+                # the pending readouts are finished before the Data_Saver is stopped
+                setpoints=[next(iter(stepper_list[i].dict)) for i in range(Nstepper)]
+                kwargs['pipeline']=Measurement_Pipeline(measure_function,setpoints=setpoints)
+                to_stop.insert(0,kwargs['pipeline'])
+            if engine=='async':
+                self.async_multisweep(stepper_list,measure_function,data_saver,wait_time,wait=wait,
+                                      journal=journal,interface=interface,batch=batch_mode,
+                                      file=temp_file,to_stop=to_stop,config_info=config_info)
+                return
+            action=[self.measure_data_to_queue,(measure_function,data_saver,wait_time),kwargs]
             for i in range(Nstepper):
                 if i<(Nstepper-1):
                     batch=True
@@ -1101,6 +1264,165 @@ class Experiment(object):
                     wait=wait,to_stop=to_stop,
                     config_info=config_info)
     
+    def async_multisweep(self,stepper_list,measure_function,q,wait_time,wait=True,journal=False,
+                         interface=None,batch=False,file=None,to_stop=[],config_info=None):
+        """
+            Internal function :
+            Run the multisweep with the coroutine run_multisweep in the loop of Async_Engine.
+            The objects of to_stop are closed and the devices unlocked when it is done.
+        """
+        if config_info != None:
+            try:
+                interface.set_text(config_info[1],config_info[0])
+            except:
+                pass
+        for stepper in stepper_list:
+            if not(stepper.name in interface.step_dict.keys()):
+                interface.create_stepper(stepper.name,stepper.device[0],stepper.device[1],
+                                         stepper.interface_start,stepper.interface_end)
+        if file != None:
+            interface.create_plotter_interface(file)
+            
+        finished=Event()
+        def done(future):
+            try:
+                future.result()
+            except Exception as error:
+                self.logger.error('Error in the multisweep : {}'.format(error))
+            try:
+                for x in to_stop:
+                    x.close()
+                for stepper in stepper_list:
+                    interface.step_dict[stepper.name]['finished']=True
+                    try:
+                        stepper.shutdown()
+                    except AttributeError:
+                        pass
+                    try:
+                        self.unlock_device(stepper.device[0],stepper.device[1])
+                    except:
+                        pass
+                if batch:
+                    interface.clear_for_batch()
+                else:
+                    interface.finished(stopped=interface.should_stop.is_set())
+            finally:
+                finished.set()
+        
+        future=Async_Engine.get().submit(run_multisweep(stepper_list,measure_function,q,wait_time,
+                                                        wait=wait,journal=journal,interface=interface,
+                                                        executor=self.executor))
+        future.add_done_callback(done)
+        # Wait for the end of the multisweep in batch mode
+        if batch:
+            finished.wait()
+            
+    def instrument_name(self,instru):
+        """
+            Internal function :
+            Return the name of the instrument in the namespace of the notebook
+        """
+        for key,value in self.instruments.items():
+            if value is instru and not(key.startswith('_')):
+                return(key)
+        raise ExperimentError('Instrument not found in the namespace.')
+    
+    def journal_info(self,stepper_list,options):
+        """
+            Internal function :
+            Return the dict saved in the journal used to rebuild the steppers
+        """
+        steppers=[]
+        for stepper in stepper_list:
+            if not(stepper.type in ('LinSweep','LinSteps','LogSteps','ArraySteps')):
+                raise ExperimentError('Journal not available for {}.'.format(stepper.type))
+            steppers.append({'type':stepper.type,'name':stepper.name,
+                             'instru':self.instrument_name(stepper.device[0]),
+                             'device':stepper.device[1],'kwargs':stepper.generate_kwargs()})
+        return({'steppers':steppers,'options':options})
+    
+    def resume(self,file,measure=None,
+               batch=False,interface=None,plotter=None,run=True):
+        """
+            Continue a multisweep done with the option journal=True after the last point 
+            saved in the file 'file'.
+            The steppers are created from the journal file (file+'.journal'), the instruments 
+            are found by their names in the namespace of the notebook. The data written after 
+            the last saved point (incomplete row) are removed from the file.
+            Compressed files cannot be resumed.
+            
+            OPTIONS :
+            - measure : specify the measured quantities in the form of a python dict. if None set to self.measure. Default : None
+            
+            EXAMPLES :
+                exp.multisweep([sweep_gate,sweep_bias],'map.dat',journal=True)
+                # after a crash of the kernel, define the instruments and exp, then
+                exp.resume('map.dat')
+        """
+        error=False
+        stepper_class={'LinSweep':LinSweep,'LinSteps':LinSteps,'LogSteps':LogSteps,'ArraySteps':ArraySteps}
+        temp_file=self.path+'/'+file
+        try:
+            # read the journal
+            try:
+                with open(temp_file+'.journal','r') as f:
+                    state=json.load(f)
+                options=state['options']
+                checkpoint=state['checkpoint']
+                offset=state['offset']
+            except:
+                raise ExperimentError('No valid journal for the file {}.'.format(file))
+            if file.split('.')[-1] in ('gz','bz2','xz'):
+                raise ExperimentError('Compressed files cannot be resumed.')
+            # create the steppers
+            stepper_list=[]
+            for info in state['steppers']:
+                try:
+                    instru=self.instruments[info['instru']]
+                except KeyError:
+                    raise ExperimentError('Instrument {} not defined.'.format(info['instru']))
+                stepper=stepper_class[info['type']]([instru,info['device']],name=info['name'],**info['kwargs'])
+                stepper_list.append(stepper)
+            # index of the next point, starting from the last stepper
+            resume_index=list(checkpoint['index'])
+            resume_index[-1]+=1
+            for i in range(len(stepper_list)-1,-1,-1):
+                stepper_list[i].forward=checkpoint['forward'][i]
+                if resume_index[i]>=len(stepper_list[i].sweep_values):
+                    if i==0:
+                        raise ExperimentError('The multisweep of {} is finished.'.format(file))
+                    # next run of this stepper is a full run
+                    resume_index[i]=None
+                    resume_index[i-1]+=1
+                    if stepper_list[i].mode=='serpentine':
+                        stepper_list[i].forward=not(stepper_list[i].forward)
+                stepper_list[i].resume_index=resume_index[i]
+        except ExperimentError as exception:
+            error=True
+            self.handle_error(exception,batch)
+        
+        if not(error) and run:
+            # remove the data after the last saved point
+            if options['file_format']=='hdf':
+                with h5py.File(temp_file,'a') as f:
+                    for name in f.attrs['columns']:
+                        f[name].resize(offset,axis=0)
+            else:
+                if os.path.getsize(temp_file)<offset:
+                    self.handle_error(ExperimentError('The file {} is shorter than its journal.'.format(file)),batch)
+                    return None
+                with open(temp_file,'r+b') as f:
+                    f.truncate(offset)
+            config_info=['Resume','Sweeps: {}, File :{}'.format(len(stepper_list),file)]
+            self.logger.info('\n# RESUME : {} at {}\n'.format(file,checkpoint['index']))
+            self.multisweep(stepper_list,file,measure=measure,
+                            wait_time=options['wait_time'],wait=options['wait'],
+                            format=options['format'],file_format=options['file_format'],
+                            timestamps=options.get('timestamps',False),pipeline=options.get('pipeline',False),
+                            average=options.get('average',1),
+                            append=True,journal=True,batch=batch,interface=interface,
+                            plotter=plotter,config_info=config_info)
+            
     def move(self,device,value,rate,
              batch=False,interface=None,run=True,
              plotter=None):
@@ -1153,7 +1475,7 @@ class Experiment(object):
     def record(self,time_interval,npoints,file,
                 overwrite=False,measure=None, 
                 batch=False, interface=None,plotter=None,
-                format='line',run=True,comment=None,append=False):
+                format='line',run=True,comment=None,append=False,file_format='csv'):
         """
             Record data every time_interval (in seconds) with npoints points in the file 'file'.
             If the  file extension is .gz, .bz2 or .xz, the file is automatically compressed with the corresponding algorithm.
@@ -1168,6 +1490,7 @@ class Experiment(object):
             - measure : specify the measured quantities in the form of a python dict. if None set to self.measure. Default : None
             - comment : add the comment provided by the user to the header of the file
             - append : append value to an existing files without putting column label. Default : False
+            - file_format : format of the file, 'csv' or 'hdf' (chunked binary file, requires h5py). Default : 'csv'
                 
             EXAMPLES :
             exp.record(1,100,'file.dat',overwrite=True)
@@ -1188,7 +1511,7 @@ class Experiment(object):
                         overwrite=overwrite,format=format,measure=measure,
                         wait=True,batch=batch,interface=interface,
                         plotter=plotter,config_info=config_info,
-                        run=run,comment=comment,append=append)
+                        run=run,comment=comment,append=append,file_format=file_format)
                   
     def work_wait(self,value,dict=None,interface=None,batch=False):
         """
@@ -1324,7 +1647,8 @@ class Experiment(object):
             notebook_panel=display(Markdown(message),display_id=True)
             # launch spy client
             local_spy=Spy_Interface(measure=new_measure,format=format,
-                                    panelserver=self.panel_server,Notebook_display=notebook_panel)
+                                    panelserver=self.panel_server,Notebook_display=notebook_panel,
+                                    executor=self.executor)
             
     def get_measure(self,measure=None,file=None,format='line',append=False,overwrite=False,comment=None):
         """
@@ -1343,28 +1667,26 @@ class Experiment(object):
             
         # define the info on the order
         config_info=['Get_Measure','{0} format={1}'.format(file,format)]
-        # initialize the file to write the data
+        # initialize the file to write the data, the info is written with the data
+        header=''
         if file!=None and not(append):
             temp_file=self.check_file(file,overwrite=overwrite)
-            # write the info about the sweep in the file
+            # info about the measure for the file
             config_list=[['GET MEASURE']]
             config_list+=[[{'format':format,'overwrite':overwrite}],]
-            self.write_to_file(file,self.config(local_measure,config_list,comment=comment))
-            self.logger.info('\n{}# FILE : {}\n'.format(self.config(local_measure,config_list,comment=comment),file))
+            header=self.config(local_measure,config_list,comment=comment)
+            self.logger.info('\n{}# FILE : {}\n'.format(header,file))
         
         # Create one Measurement object
-        measure_function=Measurement(local_measure,format=format)
+        measure_function=Measurement(local_measure,format=format,executor=self.executor,latency=self.latency)
         
         # Take measurement and format it
         measurement=measure_function.take()
         
-        # If file is provided save to it
+        # If file is provided save the info and the data to it in a single write
         try:
             if file!=None:
-                if not(append):
-                    measurement.to_csv(file,index=False,header=True,mode='a')
-                else:
-                    measurement.to_csv(file,index=False,header=False,mode='a')
+                self.write_to_file(file,header,data=measurement,append=append)
         except:
             pass
         
@@ -1373,6 +1695,37 @@ class Experiment(object):
         
         return(measurement)      
     
+    def latency_histograms(self,instru=None):
+        """
+            Return a dataframe with the statistics of the read durations (in seconds) of each 
+            instrument, measured during the multisweeps and get_measure since the last reset. 
+            If instru is given, return the histogram of this instrument as a Series.
+            
+            EXAMPLES :
+                exp.latency_histograms()                # count, mean, median, p90, p99, max...
+                exp.latency_histograms(lockin).plot()   # histogram of the reads of lockin
+                exp.reset_latency()
+        """
+        if instru!=None:
+            try:
+                return(self.latency[instru].to_series())
+            except KeyError:
+                return(None)
+        summary={}
+        for this_instru,histogram in list(self.latency.items()):
+            try:
+                name=self.instrument_name(this_instru)
+            except ExperimentError:
+                name=getattr(this_instru,'name',str(this_instru))
+            summary[name]=histogram.summary()
+        return(pd.DataFrame.from_dict(summary,orient='index'))
+    
+    def reset_latency(self):
+        """
+            Reset the histograms of the read durations
+        """
+        self.latency.clear()
+        
     def plot(self,file):
         """
             Plot data from file in a Jupyter notebook cell. 
@@ -39,6 +39,7 @@ from matplotlib.figure import Figure
 from IPython.display import Markdown,Image,display
 from IPython import get_ipython
 from pymeso.utils import Measurement,Alias
+from pymeso.utils.data_file import read_data_file,read_header
 
 class Fake_Measurement(object):
     """
@@ -57,8 +58,10 @@ class Monitor_Interface(object):
     """
         Class used to have a Monitor interface 
     """
-    def __init__(self,measure={},format='line',check=[],warning=[]):
+    def __init__(self,measure={},format='line',check=[],warning=[],executor=None):
         self.ip=get_ipython()
+        # executor shared with the Experiment
+        self.executor=executor
         self.check_panel=pn.Column()
         self.tabular=pn.pane.DataFrame(pd.DataFrame({}),sizing_mode="stretch_both", max_height=300,max_width=600)
         self.monitor_panel=pn.Column(self.tabular,self.check_panel)
@@ -201,7 +204,7 @@ class Monitor_Interface(object):
         if self._measure=={}:
             self.measure_function=Fake_Measurement()
         else:
-            self.measure_function=Measurement(self._measure,format=self.format)
+            self.measure_function=Measurement(self._measure,format=self.format,executor=self.executor)
         # Close previous Measurement object
         try:
             old_measure_function.close()
@@ -286,6 +289,8 @@ class Panel_Interface_Exp(object):
     def __init__(self,batch=False,interface=None,panelserver=None,panelport=5009):
         # create the stepper dict
         self.step_dict={}
+        # in-memory data of the sweep (Data_Buffer), the file is read if None
+        self.data_buffer=None
         # message to display by the interface
         self._message=''
         if interface==None:
@@ -490,6 +495,24 @@ class Panel_Interface_Exp(object):
     
     def set_stepper_value(self,name,value):
         self.step_dict[name]['slider'].value=value
+    
+    def create_saver_monitor(self,data_saver,refresh=1.0):
+        """
+            Method for showing the state of the Data_Saver (queue, write time, data written,
+            dropped and spilled data) updated every refresh (in s) until the saver is closed
+        """
+        self.saver_text=pn.widgets.TextInput(name='Data saver :',value='',disabled=True,width=590)
+        self.mainpanel.append(self.saver_text)
+        thread_saver_monitor = Thread(name='Saver_Monitor',target=self.update_saver_monitor,args=(data_saver,refresh))
+        thread_saver_monitor.start()
+        
+    def update_saver_monitor(self,data_saver,refresh):
+        while data_saver.is_running():
+            metrics=data_saver.metrics()
+            self.saver_text.value='queue: {} | write: {:.1f} ms | {:.3f} MB, {} rows | dropped: {} | spilled: {}'.format(
+                metrics['queue_depth'],1e3*metrics['write_latency'],metrics['bytes_written']/1e6,
+                metrics['rows_written'],metrics['dropped'],metrics['spilled'])
+            time.sleep(refresh)
                  
     def set_text(self,value,description=None):
         time.sleep(0.1)
@@ -566,11 +589,22 @@ class Panel_Interface_Exp(object):
         thread_read_columns = Thread(name='Read_column_name',target=self.read_columns_name)
         thread_read_columns.start()
               
+    def read_data(self):
+        """
+            Return the data of the sweep from the data buffer if available, 
+            otherwise from the file
+        """
+        if self.data_buffer!=None:
+            return(self.data_buffer.to_dataframe())
+        return(read_data_file(self._file))
+        
     def init_xyz_lists(self):
         read_file=False
         while not(read_file):
             try:
-                data=pd.read_csv(self._file,comment='#',header=0)
+                data=self.read_data()
+                if len(data.columns)==0:
+                    raise ValueError('no data')
                 read_file=True
             except:
                 time.sleep(0.5)
@@ -593,31 +627,7 @@ class Panel_Interface_Exp(object):
         """
             Count the header length and return (header_length, header_str)
         """
-        # handle compressed files
-        file_handler={'gz':gzip.open,'bz2':bz2.open,'xz':lzma.open}
-        extension=self._file.split('.')[-1]
-        if extension in ('gz','bz2','xz'):
-            file_open=file_handler[extension]
-            mode_open='rt'
-        else:
-            file_open=open
-            mode_open='r'
-        
-        comment='#'
-        header = ""
-        header_read = False
-        header_count = 0
-        
-        with file_open(self._file, mode_open) as f:
-        #with open(self._file, 'r') as f:
-            while not header_read:
-                line = f.readline()
-                if line.startswith(comment):
-                    header += line.strip() + '\n'
-                    header_count += 1
-                else:
-                    header_read = True
-        return((header_count,header))
+        return(read_header(self._file))
         
     def header_analyse(self,header):
         """
@@ -654,7 +664,7 @@ class Panel_Interface_Exp(object):
         return(plot_range)
     
     def plot_fig(self,*args):
-        data=pd.read_csv(self._file,comment='#',header=0)
+        data=self.read_data()
         data.insert(0,'Index',list(range(len(data))))
         fig = Figure(dpi=100)
         if self.zdata.value[0] == "None": # case of regular figure
@@ -793,7 +803,9 @@ class Spy_Interface(object):
     """
         Class used to have a Spy interface 
     """
-    def __init__(self,measure={},format='line',panelserver=None,Notebook_display=None):
+    def __init__(self,measure={},format='line',panelserver=None,Notebook_display=None,executor=None):
+        # executor shared with the Experiment
+        self.executor=executor
         # Notebook cell to update when spy is closed
         self._notebook_display=Notebook_display
         # Panel server
@@ -860,7 +872,7 @@ class Spy_Interface(object):
         if self._measure=={}:
             self.measure_function=Fake_Measurement()
         else:
-            self.measure_function=Measurement(self._measure,format=self.format)
+            self.measure_function=Measurement(self._measure,format=self.format,executor=self.executor)
         # Close previous Measurement object
         try:
             old_measure_function.close()
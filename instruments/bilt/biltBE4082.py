@@ -100,6 +100,25 @@ class BiltBE4082(Instrument):
             filter=3
         self.write(self._slot+"MEAS:FIL {}".format(filter))
         
+    def coalesce(self,name):
+        """ Return (group, item) if the property can be read with the other channels
+        of the module in one query (see read_coalesced), otherwise None. The channels 
+        are grouped by resource, so that the channels created separately on the same 
+        port are coalesced. """
+        if name=='voltage':
+            connection=getattr(self.adapter,'connection',None)
+            resource=getattr(connection,'resource_name',None)
+            if not(isinstance(resource,str)):
+                resource=id(self.adapter)
+            return((resource,'MEAS',self._slot_number),self._channel)
+        return None
+        
+    def read_coalesced(self,items):
+        """ Return the voltages of the channels listed in items with one message 
+        chaining their MEAS? queries (same query as the property voltage) """
+        command='i'+str(int(self._slot_number))+';'+';'.join('c'+str(int(channel))+';MEAS?' for channel in items)
+        return([float(value) for value in self.ask(command).strip().split(';')])
+        
     def get_data_dict(self):
         """ Get some data and generate a dict"""
         device_data=self.ask(self._slot+'IDATA?').split(';')
@@ -121,6 +121,12 @@ class Instrument(object):
     def binary_values(self, command, header_bytes=0, dtype=np.float32):
         return(self.adapter.binary_values(command, header_bytes, dtype))
 
+    def binary_block(self, command, dtype=np.float32, is_big_endian=False):
+        """ Reads the values of an IEEE 488.2 binary block returned by the 
+        instrument through the adapter.
+        """
+        return(self.adapter.binary_block(command, dtype, is_big_endian))
+
     @staticmethod
     def control(get_command, set_command, docs,
                 validator=lambda v, vs: v, values=(), map_values=False,
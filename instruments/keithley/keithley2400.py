@@ -320,6 +320,23 @@ class Keithley2400(Instrument, KeithleyBuffer):
             adapter, "Keithley 2400 SourceMeter", **kwargs
         )
 
+    def coalesce(self, name):
+        """ Return (group, item) if the property is read with the :READ? query, so that
+        voltage, current and resistance are read with one query (see read_coalesced),
+        otherwise None """
+        if name in ('voltage', 'current', 'resistance'):
+            return((id(self), 'READ'), name)
+        return None
+
+    def read_coalesced(self, items):
+        """ Return the result of one :READ? query for each item, as the properties
+        voltage, current and resistance do (the list of the values of the
+        concurrent functions, or the value if only one function is read) """
+        values = self.values(":READ?")
+        if len(values) == 1:
+            values = values[0]
+        return([values for item in items])
+
     def enable_source(self):
         """ Enables the source of current or voltage depending on the
         configuration of the instrument. """
@@ -27,7 +27,6 @@
 #
 
 from pymeso.instruments import Instrument
-import pymeso.instruments.utils.utils as utils
 import numpy as np
 
 class LecroyHRO66(Instrument):
@@ -51,13 +50,26 @@ class LecroyHRO66(Instrument):
             **kwargs
         )
         self.write('CHDR OFF')
+        self.write('COMM_FORMAT DEF9,WORD,BIN')
+        self.write('COMM_ORDER LO')
+        
+    def get_waveform(self,source):
+        """
+            Get the data points of the trace source (C1, M1, SpecAn...), transferred as 
+            a binary block of 16 bits words scaled with the vertical gain and offset of the 
+            waveform descriptor
+        """
+        desc=self.binary_block(source+':WF? DESC',dtype=np.uint8)
+        gain=np.frombuffer(desc,dtype='<f4',count=1,offset=156)[0]
+        offset=np.frombuffer(desc,dtype='<f4',count=1,offset=160)[0]
+        data=self.binary_block(source+':WF? DAT1',dtype=np.int16)
+        return(np.float64(gain)*data-np.float64(offset))
         
     def get_channel(self,N):
         """
             Get the data points of the channel N
         """
-        order_str='C'+str(N)+':INSP? DATA_ARRAY_1, float'
-        return(utils.convert_to_np_array(self.ask(order_str)))
+        return(self.get_waveform('C'+str(N)))
         
     @property
     def channel1(self):
@@ -73,8 +85,7 @@ class LecroyHRO66(Instrument):
         """
             Get the data points in the memory N
         """
-        order_str='M'+str(N)+':INSP? DATA_ARRAY_1, float'
-        return(utils.convert_to_np_array(self.ask(order_str)))
+        return(self.get_waveform('M'+str(N)))
         
     @property
     def memory1(self):
@@ -91,8 +102,7 @@ class LecroyHRO66(Instrument):
         """
             Get the spectrum
         """
-        order_str='SpecAn:INSP? DATA_ARRAY_1, float'
-        return(utils.convert_to_np_array(self.ask(order_str)))
+        return(self.get_waveform('SpecAn'))
         
     def stop(self):
         self.write('STOP')
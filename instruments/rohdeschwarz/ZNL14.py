@@ -27,7 +27,6 @@
 #
 
 from pymeso.instruments import Instrument
-import pymeso.instruments.utils.utils as utils
 import numpy as np
 
 class ZNL14(Instrument):
@@ -57,14 +56,23 @@ class ZNL14(Instrument):
             Id of the VNA
         """
         return(self.query('*IDN?'))
+        
+    def read_data(self):
+        """
+            Read the real and imaginary parts (interleaved) of the active scan, transferred 
+            as a binary block of little endian 64 bits floats
+        """
+        self.write('FORM REAL,64; :FORM:BORD SWAP')
+        data=self.binary_block('CALC:DATA? SDAT',dtype=np.float64)
+        self.write('FORM ASC')
+        return(data)
     
     @property
     def real(self):
         """
             Read the real part of the active scan
         """
-        order_str="CALC:DATA? SDAT"
-        self._data=utils.convert_to_np_array(self.ask(order_str))
+        self._data=self.read_data()
         self._data_real=self._data[0::2]
         self._data_imag=self._data[1::2]
         return(self._data_real)
@@ -97,8 +105,7 @@ class ZNL14(Instrument):
         """
         self.write('INIT:CONT OFF; :INIT')
         self.ask('*OPC?')
-        order_str="CALC:DATA? SDAT"
-        self._data=utils.convert_to_np_array(self.ask(order_str))
+        self._data=self.read_data()
         return(self._data)
         
     @property
@@ -223,8 +230,7 @@ class ZNL14(Instrument):
         self.write('AVER ON')
         self.write('INIT:CONT OFF; :INIT')
         self.ask('*OPC?')
-        order_str="CALC:DATA? SDAT"
-        self._data=utils.convert_to_np_array(self.ask(order_str))
+        self._data=self.read_data()
         return(self._data)              
         
     # return configuration
@@ -289,6 +289,30 @@ class SR830(Instrument):
         self.checking['aux_out_3']=lambda x: (x>=-10.5) & (x<=10.5)
         self.checking['aux_out_4']=lambda x: (x>=-10.5) & (x<=10.5)
 
+    # parameters of the SNAP? command
+    SNAP_PARAMETERS={'x':1,'y':2,'magnitude':3,'theta':4,
+                     'aux_in_1':5,'aux_in_2':6,'aux_in_3':7,'aux_in_4':8,
+                     'adc1':5,'adc2':6,'adc3':7,'adc4':8,'frequency':9}
+
+    def coalesce(self, name):
+        """ Return (group, item) if the property can be read with other ones
+        in one SNAP? query (see read_coalesced), otherwise None """
+        if name in self.SNAP_PARAMETERS:
+            return((id(self),'SNAP'),self.SNAP_PARAMETERS[name])
+        return None
+
+    def read_coalesced(self, items):
+        """ Read simultaneously the SNAP? parameters listed in items
+        (at most 6 parameters per query) """
+        values=[]
+        for i in range(0,len(items),6):
+            parameters=list(items[i:i+6])
+            # SNAP? requires at least 2 parameters
+            if len(parameters)==1:
+                parameters=parameters*2
+            values+=self.values('SNAP?'+','.join(str(p) for p in parameters))[:len(items[i:i+6])]
+        return(values)
+
     def auto_gain(self):
         self.write("AGAN")
 
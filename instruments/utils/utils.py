@@ -30,6 +30,7 @@ import numpy as np
 import pandas as pd
 from PyQt5 import QtWidgets
 import re
+from pymeso.utils.data_file import Data_File
 
 def convert_to_np_array(input):
     '''
@@ -38,13 +39,28 @@ def convert_to_np_array(input):
     treat=re.findall(r'([+-]?\d+(?:\.\d+)?(?:[eE][+-]\d+)?)', input)
     return(np.array(list(map(float,treat))))
 
-def file_to_df(input=None,line=10):
+def file_to_df(input=None,line=None):
+    '''
+        Read a data file and return a dataframe, line is the number of the line with the 
+        column names. If line is None, the pymeso data files (header starting with #) are 
+        read through their row index and the other files use line=10.
+    '''
     if input==None:
         dir ='./'
         fname = QtWidgets.QFileDialog.getOpenFileName(None, "Select data file...", 
                     dir, filter="All files (*);; SM Files (*.sm)")
         input=fname[0]
         print('The file is :', input)
+    if line==None:
+        try:
+            with open(input,'rb') as f:
+                pymeso_file=(f.read(1)==b'#')
+            if pymeso_file and not(input.split('.')[-1] in ('gz','bz2','xz')):
+                with Data_File(input) as data:
+                    return(data.rows())
+        except:
+            pass
+        line=10
     return(pd.read_csv(input,header=line))
     
 def df_to_matrix(df,x=None,y=None,z=None):
@@ -33,6 +33,7 @@ from pymeso.instruments.validators import strict_discrete_set, truncated_discret
 from pymeso.utils import ExperimentError
 
 MIN_RAMP_TIME = 0.1  # seconds
+MAX_RAMP_TIME = 3600.0  # seconds
 
 
 class GS200(Instrument):
@@ -210,6 +211,27 @@ class GS200(Instrument):
         self.write(":program:edit:start;:source:level {};:program:edit:end".format(level))
         self.write(":program:run")
             
+    def source_level_ramp(self,start,end,rate):
+        """
+            Hardware ramp of source_level used by Sweep : ramp(start,end,rate)
+            Start a program ramping the output from start to end at the given rate and return 
+            its duration in s. Return None if the ramp shall be done by software (source disabled, 
+            ramp shorter than MIN_RAMP_TIME or longer than MAX_RAMP_TIME).
+        """
+        ramp_time=abs((end-start)/rate)
+        if ramp_time<MIN_RAMP_TIME or ramp_time>MAX_RAMP_TIME or not(self.source_enabled):
+            return(None)
+        self.source_level=start
+        self.trigger_ramp_to_level(end,ramp_time)
+        return(ramp_time)
+        
+    def source_level_ramp_stop(self):
+        """
+            Abort the program started by source_level_ramp
+        """
+        self.write(':program:hold')
+        self.write(':program:edit:start;:program:edit:end')
+            
     def level_sweep(self,start,end,rate):
         """
             Method used to ramp the source : sweep(start,end,rate)
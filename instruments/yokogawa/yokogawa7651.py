@@ -39,6 +39,9 @@ from time import sleep
 import numpy as np
 import re
 
+MIN_RAMP_TIME = 0.1  # seconds
+MAX_RAMP_TIME = 3600.0  # seconds
+
 
 class Yokogawa7651(Instrument):
     """ Represents the Yokogawa 7651 Programmable DC Source and provides a high-level for interacting with the instrument.
@@ -238,6 +241,27 @@ class Yokogawa7651(Instrument):
                         "RU2"
         self.write(ramp_program)
         
+    def source_level_ramp(self,start,end,rate):
+        """
+            Hardware ramp of source_level used by Sweep : ramp(start,end,rate)
+            Start a program ramping the output from start to end at the given rate and return 
+            its duration in s. Return None if the ramp shall be done by software (source disabled, 
+            ramp shorter than MIN_RAMP_TIME or longer than MAX_RAMP_TIME).
+        """
+        ramp_time=abs((end-start)/rate)
+        if ramp_time<MIN_RAMP_TIME or ramp_time>MAX_RAMP_TIME or not(self.source_enabled):
+            return(None)
+        self.source_level=start
+        self.trigger_ramp_to_level(end,ramp_time)
+        return(ramp_time)
+        
+    def source_level_ramp_stop(self):
+        """
+            Abort the program started by source_level_ramp
+        """
+        self.write('RU0')
+        self.write('PRS;PRE;')
+        
     def level_sweep(self,start,end,rate):
         """
             Method used to ramp the source level : sweep(start,end,rate)
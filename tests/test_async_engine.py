@@ -0,0 +1,119 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import time
+import threading
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from pymeso.utils.async_engine import Async_Engine,run_multisweep
+from pymeso.utils.measure import Measurement,records_to_dataframe
+from pymeso.utils.utility import LinSteps,AdaptiveSteps
+
+class Source(object):
+    """
+        Fake instrument with a settable value
+    """
+    def __init__(self):
+        self.value=0.0
+
+def multisweep(steppers,measure,journal=False):
+    q=Queue()
+    executor=ThreadPoolExecutor(max_workers=4)
+    measurement=Measurement(measure,record=True,executor=executor)
+    try:
+        stopped=Async_Engine.get().run(run_multisweep(steppers,measurement,q,0,wait=False,
+                                                      journal=journal,executor=executor))
+    finally:
+        measurement.close()
+        executor.shutdown()
+    return(stopped,[q.get() for i in range(q.qsize())])
+
+def test_async_multisweep_order():
+    gate,bias=Source(),Source()
+    steppers=[LinSteps([gate,'value'],0,1,3,0,name='Vg'),LinSteps([bias,'value'],0,2,5,0,name='Vb')]
+    stopped,data=multisweep(steppers,{'Vg':[gate,'value'],'Vb':[bias,'value']})
+    assert not(stopped)
+    df=records_to_dataframe(np.concatenate(data))
+    assert list(df['Vg'])==[0.0]*5+[0.5]*5+[1.0]*5
+    assert list(df['Vb'])==[0.0,0.5,1.0,1.5,2.0]*3
+    
+def test_async_multisweep_journal_and_observe():
+    source=Source()
+    stepper=AdaptiveSteps([source,'value'],0,1,5,0,'x',max_points=8)
+    stopped,data=multisweep([stepper],{'x':[source,'value']},journal=True)
+    assert len(data)==8
+    df,checkpoint=data[-1]
+    assert checkpoint['index']==[stepper.sweep_index] and checkpoint['forward']==[True]
+    assert len(stepper.observed)==8
+
+class Interface(object):
+    """
+        Fake interface with the Events of the stop and pause buttons
+    """
+    def __init__(self):
+        self.should_stop=threading.Event()
+        self.should_pause=threading.Event()
+        
+    def set_stepper_status(self,name,status,mode):
+        pass
+        
+    def set_stepper_value(self,name,value):
+        pass
+
+def test_async_multisweep_stop_interrupts_the_wait():
+    source=Source()
+    interface=Interface()
+    q=Queue()
+    measurement=Measurement({'x':[source,'value']},record=True)
+    stepper=LinSteps([source,'value'],0,1,3,0,name='x')
+    try:
+        future=Async_Engine.get().submit(run_multisweep([stepper],measurement,q,60,wait=True,interface=interface))
+        time.sleep(0.2)
+        t0=time.monotonic()
+        interface.should_stop.set()
+        assert future.result(timeout=5)
+        assert time.monotonic()-t0<1
+        assert q.qsize()==0
+    finally:
+        measurement.close()
+        
+def test_async_multisweep_pause():
+    source=Source()
+    interface=Interface()
+    interface.should_pause.set()
+    q=Queue()
+    measurement=Measurement({'x':[source,'value']},record=True)
+    stepper=LinSteps([source,'value'],0,1,3,0,name='x')
+    try:
+        future=Async_Engine.get().submit(run_multisweep([stepper],measurement,q,0,wait=False,interface=interface))
+        time.sleep(0.3)
+        assert q.qsize()==0 and not(future.done())
+        interface.should_pause.clear()
+        assert not(future.result(timeout=5))
+        assert q.qsize()==3
+    finally:
+        measurement.close()
@@ -0,0 +1,134 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import io
+import numpy as np
+import pytest
+
+from pymeso.adapters.adapter import parse_binary_block
+from pymeso.adapters.serial import SerialAdapter
+
+class Connection(io.BytesIO):
+    """
+        Fake serial connection returning the data by chunks of 5 bytes
+    """
+    def read_until(self,expected=b'\n'):
+        data=b''
+        while not(data.endswith(expected)):
+            byte=self.read(1)
+            if byte==b'':
+                break
+            data+=byte
+        return(data)
+        
+    def readinto(self,buffer):
+        return(super().readinto(buffer[:5]))
+        
+    timeouts=0
+    
+    def readlines(self):
+        # the data are read until the timeout
+        self.timeouts+=1
+        return(super().readlines())
+
+def block(values,termination=b'\n'):
+    data=values.tobytes()
+    length=str(len(data))
+    return(b'#'+str(len(length)).encode()+length.encode()+data+termination)
+
+def adapter(response):
+    adapter=SerialAdapter.__new__(SerialAdapter)
+    adapter.connection=Connection(response)
+    adapter.buffer=bytearray()
+    return(adapter)
+
+def test_parse_binary_block():
+    values=np.arange(10,dtype=np.float32)
+    assert np.array_equal(parse_binary_block(b'CURVE '+block(values)),values)
+    assert np.array_equal(parse_binary_block(b'#0'+values.tobytes()+b'\n'),values)
+    big=values.astype('>i2')
+    assert np.array_equal(parse_binary_block(block(big),np.int16,is_big_endian=True),values)
+    with pytest.raises(ValueError):
+        parse_binary_block(b'1,2,3\n')
+
+def test_serial_read_binary_block():
+    values=np.linspace(0,1,101)
+    serial=adapter(block(values)+b'1.5\n')
+    data=serial.read_binary_block(np.float64)
+    assert np.array_equal(data,values)
+    # the termination is read but not the next response
+    assert serial.connection.read()==b'1.5\n'
+    
+def test_serial_read_binary_block_remaining_bytes():
+    values=np.arange(7,dtype=np.int16)
+    # 15 bytes : 7 values and a remaining byte
+    serial=adapter(b'#215'+values.tobytes()+b'\x00\r\nOK')
+    data=serial.read_binary_block(np.int16,termination=b'\r\n')
+    assert np.array_equal(data,values)
+    assert serial.connection.read()==b'OK'
+    
+def test_serial_read_binary_block_too_short():
+    values=np.arange(10,dtype=np.float32)
+    with pytest.raises(ValueError):
+        adapter(block(values)[:20]).read_binary_block()
+
+def test_serial_read_binary_block_reuses_buffer():
+    serial=adapter(block(np.arange(100,dtype=np.float32))+block(np.arange(10,dtype=np.float32)))
+    first=serial.read_binary_block()
+    buffer=serial.buffer
+    second=serial.read_binary_block()
+    assert serial.buffer is buffer and len(buffer)==400
+    assert np.array_equal(first,np.arange(100)) and np.array_equal(second,np.arange(10))
+    assert serial.connection.timeouts==0
+    
+def test_serial_read_binary_block_indefinite():
+    values=np.arange(6,dtype=np.int16)+0x100
+    serial=adapter(b'#0'+values.tobytes()+b'\nOK')
+    assert np.array_equal(serial.read_binary_block(np.int16),values)
+    assert serial.connection.read()==b'OK'
+
+def test_serial_read_raw():
+    values=np.arange(20,dtype=np.float32)
+    # length with leading zeros and termination characters in the data
+    data=values.tobytes()+b'\n\n'
+    serial=adapter(b'CURV #3082'+data+b'\n1.5\n')
+    raw=serial.read_raw()
+    assert raw==b'CURV #3082'+data
+    assert np.array_equal(parse_binary_block(raw)[:20],values)
+    assert serial.read_raw()==b'1.5\n'
+    assert serial.connection.timeouts==0
+
+def test_serial_binary_values():
+    values=np.arange(8,dtype=np.float32)
+    serial=adapter(b'HEAD'+values.tobytes())
+    serial.write=lambda command: None
+    data=serial.binary_values('TRCB?1,0,8',header_bytes=4)
+    assert np.array_equal(data,values)
+    # writable array, as with np.fromstring
+    data[0]=1.0
+    serial=adapter(b'HEAD'+values.tobytes()+b'\x00')
+    serial.write=lambda command: None
+    with pytest.raises(ValueError):
+        serial.binary_values('TRCB?1,0,8',header_bytes=4)
@@ -0,0 +1,80 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import re
+
+from pymeso.instruments.bilt.biltBE4082 import BiltBE4082
+from pymeso.utils.measure import Measurement
+
+class Connection(object):
+    def __init__(self,resource_name):
+        self.resource_name=resource_name
+
+class Bilt_Adapter(object):
+    """
+        Fake adapter of a Bilt chassis answering the MEAS? queries of the channels
+    """
+    voltages={(2,1):0.125,(2,2):-1.5,(2,3):2e-3,(3,1):7.0}
+    
+    def __init__(self,resource_name,queries):
+        self.connection=Connection(resource_name)
+        self.queries=queries
+    
+    def ask(self,command):
+        self.queries.append(command)
+        slot=int(re.match(r'i(\d+);',command).group(1))
+        channels=[int(channel) for channel in re.findall(r'c(\d+);MEAS\?',command)]
+        return(';'.join('{:+.6E}'.format(self.voltages[(slot,channel)]) for channel in channels)+'\n')
+
+def channels(queries,*slot_channels):
+    return([BiltBE4082(Bilt_Adapter('ASRL4::INSTR',queries),slot,channel) for slot,channel in slot_channels])
+
+def test_bilt_coalesced_read_matches_property():
+    queries=[]
+    dmm=channels(queries,(2,1),(2,2),(2,3))
+    measure={'V{}'.format(i):[instru,'voltage'] for i,instru in enumerate(dmm)}
+    measurement=Measurement(measure,format='col')
+    try:
+        # the channels created separately on the same port are on one bus and read with one query
+        assert measurement.groups==[['V0','V1','V2']]
+        assert set(measurement.coalesced)=={'V0','V1','V2'}
+        df=measurement.take()
+        assert queries==['i2;c1;MEAS?;c2;MEAS?;c3;MEAS?']
+        assert list(df.iloc[0])==[instru.voltage for instru in dmm]
+    finally:
+        measurement.close()
+
+def test_bilt_coalesce_groups():
+    queries=[]
+    dmm=channels(queries,(2,1),(3,1))+[BiltBE4082(Bilt_Adapter('ASRL5::INSTR',queries),2,2)]
+    assert dmm[0].coalesce('voltage')[0]!=dmm[1].coalesce('voltage')[0]
+    assert dmm[0].coalesce('voltage')[0]!=dmm[2].coalesce('voltage')[0]
+    assert dmm[0].coalesce('range')==None
+    measurement=Measurement({'V{}'.format(i):[instru,'voltage'] for i,instru in enumerate(dmm)})
+    try:
+        assert measurement.coalesced=={}
+        assert sorted(measurement.groups)==[['V0','V1'],['V2']]
+    finally:
+        measurement.close()
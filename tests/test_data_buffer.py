@@ -0,0 +1,51 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import numpy as np
+import pandas as pd
+
+from pymeso.utils.utility import Data_Buffer
+
+def rows(start,N):
+    return(pd.DataFrame({'x':np.arange(start,start+N,dtype=float),'name':['p{}'.format(i) for i in range(start,start+N)]}))
+
+def test_data_buffer_grows():
+    buffer=Data_Buffer(size=4)
+    for i in range(0,30,3):
+        buffer.append(rows(i,3))
+    assert len(buffer)==30 and buffer.size==32
+    df=buffer.to_dataframe()
+    assert list(df['x'])==list(range(30))
+    assert list(df['name'])==['p{}'.format(i) for i in range(30)]
+
+def test_data_buffer_ring_keeps_last_rows():
+    buffer=Data_Buffer(size=10**9,maxlen=10)
+    for i in range(0,1000,7):
+        buffer.append(rows(i,7))
+        assert len(buffer)==min(i+7,10)
+    # the memory is bounded by maxlen, not by the number of points
+    assert buffer.size==20
+    assert list(buffer.column('x'))==list(range(991,1001))
+    assert list(buffer.to_dataframe()['name'])==['p{}'.format(i) for i in range(991,1001)]
@@ -0,0 +1,79 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import pandas as pd
+
+from pymeso.utils.data_file import Data_File,read_data_file
+
+TEXT='''# TIME
+# start : today
+# MEASURE
+# I(A) : Keithley.current
+x,label,I(A)
+'''
+
+def write(file,N,offset=0,mode='w'):
+    with open(file,mode) as f:
+        if mode=='w':
+            f.write(TEXT)
+        for i in range(offset,offset+N):
+            f.write('{},p{},{}\n'.format(0.5*i,i,2.0*i))
+
+def test_data_file_rows_and_columns(tmp_path):
+    file=str(tmp_path/'data.dat')
+    write(file,50)
+    with Data_File(file) as data:
+        assert len(data)==50
+        assert data.columns==['x','label','I(A)']
+        assert all(type(name) is str for name in data.columns)
+        assert data.config=={'TIME':['start : today'],'MEASURE':['I(A) : Keithley.current']}
+        pd.testing.assert_frame_equal(data.rows(),read_data_file(file))
+        pd.testing.assert_frame_equal(data.rows(10,20),read_data_file(file)[10:20].reset_index(drop=True))
+        assert list(data.column('I(A)',0,3))==[0.0,2.0,4.0]
+        assert list(data.rows(48,100)['label'])==['p48','p49']
+
+def test_data_file_refresh(tmp_path):
+    file=str(tmp_path/'data.dat')
+    write(file,10)
+    with Data_File(file) as data:
+        write(file,5,offset=10,mode='a')
+        assert len(data)==10
+        data.refresh()
+        assert len(data)==15
+        pd.testing.assert_frame_equal(data.rows(),read_data_file(file))
+
+def test_data_file_cache(tmp_path):
+    file=str(tmp_path/'data.dat')
+    write(file,10)
+    Data_File(file).close()
+    assert not((tmp_path/'data.dat.idx.npz').exists())
+    Data_File(file,cache=True).close()
+    assert (tmp_path/'data.dat.idx.npz').exists()
+    write(file,5,offset=10,mode='a')
+    with Data_File(file,cache=True) as data:
+        assert len(data)==15
+        assert data.columns==['x','label','I(A)']
+        assert all(type(name) is str for name in data.columns)
+        pd.testing.assert_frame_equal(data.rows(),read_data_file(file))
@@ -0,0 +1,225 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os,json,time,threading
+import numpy as np
+import pandas as pd
+import pytest
+
+from pymeso.utils.utility import Data_Saver,Writer_Service,ExperimentError
+from pymeso.utils.data_file import read_data_file,read_header
+
+HEADER='# TIME : test\n'
+
+def points(N,offset=0):
+    return([pd.DataFrame({'x':[float(i+offset)],'y':[2.0*(i+offset)],'n':[i+offset]}) for i in range(N)])
+
+def save(file,data,**kwargs):
+    saver=Data_Saver(str(file),header=kwargs.pop('header',HEADER),**kwargs)
+    for df in data:
+        saver.put(df)
+    saver.close()
+    assert saver.done.wait(10)
+    return(saver)
+
+def expected(N,offset=0):
+    return(pd.concat(points(N,offset),ignore_index=True))
+
+@pytest.mark.parametrize('name',['data.dat','data.dat.gz','data.dat.bz2','data.dat.xz'])
+def test_csv_round_trip(tmp_path,name):
+    file=tmp_path/name
+    save(file,points(20))
+    pd.testing.assert_frame_equal(read_data_file(str(file)),expected(20))
+
+@pytest.mark.parametrize('name',['data.dat','data.dat.gz'])
+def test_overwrite_replaces_file(tmp_path,name):
+    file=tmp_path/name
+    save(file,points(20))
+    save(file,points(5,offset=100))
+    pd.testing.assert_frame_equal(read_data_file(str(file)),expected(5,offset=100),check_dtype=False)
+    if name=='data.dat':
+        assert file.read_text().count('# TIME')==1
+
+def test_append_keeps_data(tmp_path):
+    file=tmp_path/'data.dat'
+    save(file,points(3))
+    save(file,points(2,offset=3),append=True)
+    pd.testing.assert_frame_equal(read_data_file(str(file)),expected(5))
+
+def test_hdf_round_trip(tmp_path):
+    file=tmp_path/'data.h5'
+    save(file,points(20),file_format='hdf',chunk_size=8)
+    # the numbers of a dataframe are saved as float64
+    pd.testing.assert_frame_equal(read_data_file(str(file)),expected(20),check_dtype=False)
+    assert read_header(str(file))[1]==HEADER
+
+def test_hdf_overwrite_and_append(tmp_path):
+    file=tmp_path/'data.h5'
+    save(file,points(20),file_format='hdf')
+    save(file,points(3,offset=100),file_format='hdf')
+    save(file,points(2,offset=103),file_format='hdf',append=True)
+    pd.testing.assert_frame_equal(read_data_file(str(file)),expected(5,offset=100),check_dtype=False)
+
+def test_hdf_records_round_trip(tmp_path):
+    file=tmp_path/'data.h5'
+    records=np.zeros(4,dtype=[('x','f8'),('n','i8'),('trace','f8',(3,))])
+    records['x']=np.arange(4)
+    records['n']=np.arange(4)*10
+    records['trace']=np.arange(12).reshape(4,3)
+    save(file,[records[:2],records[2:]],file_format='hdf')
+    df=read_data_file(str(file))
+    assert list(df.columns)==['x','n','trace_0','trace_1','trace_2']
+    assert list(df['n'])==[0,10,20,30]
+    assert np.array_equal(df[['trace_0','trace_1','trace_2']].to_numpy(),records['trace'])
+
+@pytest.mark.parametrize('name',['data.dat','data.dat.gz'])
+def test_buffered_round_trip(tmp_path,name):
+    file=tmp_path/name
+    save(file,points(25),buffered=True,buffer_size=7)
+    pd.testing.assert_frame_equal(read_data_file(str(file)),expected(25))
+
+def test_buffered_flush_time(tmp_path):
+    file=tmp_path/'data.dat'
+    saver=Data_Saver(str(file),header=HEADER,buffered=True,buffer_size=1000,flush_time=0.1)
+    try:
+        for df in points(3):
+            saver.put(df)
+        for i in range(50):
+            if saver.metrics()['rows_written']==3:
+                break
+            time.sleep(0.05)
+        pd.testing.assert_frame_equal(read_data_file(str(file)),expected(3))
+    finally:
+        saver.close()
+        assert saver.done.wait(10)
+
+def save_with_checkpoints(file,N,**kwargs):
+    saver=Data_Saver(str(file),header=HEADER,journal={'steppers':['Vg']},**kwargs)
+    for i,df in enumerate(points(N)):
+        saver.put(df,checkpoint={'index':[i],'forward':[True]})
+    saver.close()
+    assert saver.done.wait(10)
+    with open(str(file)+'.journal') as f:
+        return(json.load(f))
+
+@pytest.mark.parametrize('fsync_every',[0,3])
+def test_journal_csv(tmp_path,fsync_every):
+    file=tmp_path/'data.dat'
+    journal=save_with_checkpoints(file,10,fsync_every=fsync_every)
+    assert journal['steppers']==['Vg']
+    assert journal['checkpoint']=={'index':[9],'forward':[True]}
+    assert journal['offset']==os.path.getsize(file)
+
+def test_journal_hdf(tmp_path):
+    file=tmp_path/'data.h5'
+    journal=save_with_checkpoints(file,10,file_format='hdf')
+    assert journal['checkpoint']=={'index':[9],'forward':[True]}
+    assert journal['offset']==10
+    assert len(read_data_file(str(file)))==10
+
+def slow_writer(monkeypatch):
+    """
+        Block the writes of the savers until the returned Event is set
+    """
+    gate=threading.Event()
+    write_block=Data_Saver.write_block
+    def blocked_write_block(self,f,block,stop):
+        gate.wait(10)
+        return(write_block(self,f,block,stop))
+    monkeypatch.setattr(Data_Saver,'write_block',blocked_write_block)
+    return(gate)
+
+def test_spill_policy_keeps_order(tmp_path,monkeypatch):
+    file=tmp_path/'data.dat'
+    gate=slow_writer(monkeypatch)
+    saver=Data_Saver(str(file),header=HEADER,maxsize=2,policy='spill',spill_dir=str(tmp_path))
+    for df in points(20):
+        saver.put(df)
+    assert saver.metrics()['spilled']>0
+    assert saver.metrics()['queue_depth']>2
+    gate.set()
+    saver.close()
+    assert saver.done.wait(10)
+    assert saver.metrics()['rows_written']==20 and saver.metrics()['queue_depth']==0
+    pd.testing.assert_frame_equal(read_data_file(str(file)),expected(20))
+
+def test_drop_policy(tmp_path,monkeypatch):
+    file=tmp_path/'data.dat'
+    gate=slow_writer(monkeypatch)
+    saver=Data_Saver(str(file),header=HEADER,maxsize=2,policy='drop')
+    for df in points(20):
+        saver.put(df)
+    dropped=saver.metrics()['dropped']
+    assert dropped>0
+    gate.set()
+    saver.close()
+    assert saver.done.wait(10)
+    assert saver.metrics()['rows_written']+dropped==20
+    assert len(read_data_file(str(file)))==20-dropped
+
+def test_policy_is_checked(tmp_path):
+    with pytest.raises(ExperimentError):
+        Data_Saver(str(tmp_path/'data.dat'),policy='wait')
+
+@pytest.mark.parametrize('buffered',[False,True])
+def test_shared_writer(tmp_path,buffered):
+    files=[tmp_path/'data.dat',tmp_path/'data.dat.gz',tmp_path/'data.h5']
+    savers=[Data_Saver(str(file),header=HEADER,file_format='hdf' if file.suffix=='.h5' else 'csv',
+                       shared=True,buffered=buffered,buffer_size=4) for file in files]
+    service=Writer_Service.get()
+    assert all(saver in service.savers for saver in savers)
+    for i,df in enumerate(points(15)):
+        for k,saver in enumerate(savers):
+            saver.put(df+k)
+    for saver in savers:
+        saver.close()
+    for saver in savers:
+        assert saver.done.wait(10)
+    for k,file in enumerate(files):
+        pd.testing.assert_frame_equal(read_data_file(str(file)),expected(15)+k,check_dtype=(k<2))
+    # the thread of the service ends when all the savers are closed
+    for i in range(50):
+        if service.thread==None:
+            break
+        time.sleep(0.05)
+    assert service.thread==None
+
+@pytest.mark.parametrize('shared',[False,True])
+def test_write_error_does_not_block(tmp_path,monkeypatch,shared):
+    def failed_write_block(self,f,block,stop):
+        # error in writing, as returned by write_block
+        return(False)
+    monkeypatch.setattr(Data_Saver,'write_block',failed_write_block)
+    saver=Data_Saver(str(tmp_path/'data.dat'),header=HEADER,maxsize=2,shared=shared)
+    def work():
+        for df in points(20):
+            saver.put(df)
+        saver.close()
+    thread=threading.Thread(target=work)
+    thread.start()
+    thread.join(10)
+    assert not(thread.is_alive())
+    assert saver.done.is_set()
+    assert saver.metrics()['dropped']>0
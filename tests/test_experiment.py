@@ -0,0 +1,91 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import time
+import zlib
+import gzip
+import threading
+import pandas as pd
+
+from pymeso.experiment import Experiment
+
+def test_write_to_file_single_gzip_member(tmp_path):
+    file=str(tmp_path/'measure.dat.gz')
+    exp=Experiment.__new__(Experiment)
+    exp.write_to_file(file,'# GET MEASURE\n',data=pd.DataFrame({'V':[1.0],'I':[2.0]}))
+    with open(file,'rb') as f:
+        stream=zlib.decompressobj(wbits=31)
+        content=stream.decompress(f.read())
+    # the info and the data are in the same compressed stream
+    assert stream.eof and stream.unused_data==b''
+    assert content==b'# GET MEASURE\nV,I\n1.0,2.0\n'
+    exp.write_to_file(file,'',data=pd.DataFrame({'V':[3.0],'I':[4.0]}),append=True)
+    with gzip.open(file,'rt') as f:
+        assert f.read()=='# GET MEASURE\nV,I\n1.0,2.0\n3.0,4.0\n'
+
+class Interface(object):
+    """
+        Fake interface with the pause and stop buttons
+    """
+    def __init__(self):
+        self.should_pause=threading.Event()
+        self.should_stop=threading.Event()
+
+class Stepper(object):
+    """
+        Fake stepper ending its step after 0.05 s
+    """
+    def __init__(self):
+        self.idle=threading.Event()
+        self.paused=[]
+        self.stopped=False
+        threading.Timer(0.05,self.idle.set).start()
+        
+    def wait_idle(self,timeout=None):
+        return(self.idle.wait(timeout))
+        
+    def pause(self,state):
+        self.paused.append(state)
+        
+    def stop(self):
+        self.stopped=True
+
+def test_check_and_wait_returns_at_the_end_of_the_step():
+    exp=Experiment.__new__(Experiment)
+    stepper=Stepper()
+    t0=time.monotonic()
+    assert not(exp.check_and_wait(Interface(),stepper,timeout=5))
+    assert stepper.idle.is_set() and time.monotonic()-t0<1
+    assert stepper.paused==[False]
+
+def test_check_and_wait_stop_during_pause():
+    exp=Experiment.__new__(Experiment)
+    interface=Interface()
+    interface.should_pause.set()
+    threading.Timer(0.05,interface.should_stop.set).start()
+    stepper=Stepper()
+    assert exp.check_and_wait(interface,stepper,timeout=5)
+    assert stepper.stopped and stepper.paused[0]==True
+
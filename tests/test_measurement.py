@@ -0,0 +1,283 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import time
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+
+from pymeso.utils.measure import Measurement,Measurement_Pipeline,records_to_dataframe
+
+class Counter(object):
+    """
+        Fake instrument counting its reads
+    """
+    def __init__(self):
+        self.reads={'setpoint':0,'signal':0}
+        
+    @property
+    def setpoint(self):
+        self.reads['setpoint']+=1
+        return(0.5)
+        
+    @property
+    def signal(self):
+        self.reads['signal']+=1
+        return(float(self.reads['signal']))
+
+def test_average_not_applied_to_setpoints():
+    instru=Counter()
+    measure=Measurement({'Vg':[instru,'setpoint'],'I':[instru,'signal']},record=True,
+                        average=3,setpoints=['Vg'])
+    try:
+        assert measure.columns==['Vg','I','I_std','I_min','I_max']
+        record=measure.take()
+        assert instru.reads=={'setpoint':1,'signal':3}
+        assert record['Vg'][0]==0.5
+        assert record['I'][0]==2.0 and record['I_min'][0]==1.0 and record['I_max'][0]==3.0
+    finally:
+        measure.close()
+
+def test_key_option_overrides_average():
+    instru=Counter()
+    measure=Measurement({'Vg':[instru,'setpoint',{'average':2}],'I':[instru,'signal']},record=True,
+                        average=1,setpoints=['Vg'])
+    try:
+        measure.take()
+        assert instru.reads=={'setpoint':2,'signal':1}
+    finally:
+        measure.close()
+
+class Source(object):
+    """
+        Fake stepped instrument
+    """
+    def __init__(self):
+        self.value=0.0
+        
+class Probe(object):
+    """
+        Fake instrument reading the source (slowly), and a buffer of values 
+        acquired at each point and read in order
+    """
+    def __init__(self,source):
+        self.source=source
+        self.points=[]
+        
+    @property
+    def signal(self):
+        time.sleep(0.01)
+        return(self.source.value)
+        
+    @property
+    def buffer(self):
+        time.sleep(0.01)
+        return(self.points.pop(0))
+
+def pipelined_run(measure,source,probe,N=10):
+    q=Queue()
+    measurement=Measurement(measure,record=True)
+    pipeline=Measurement_Pipeline(measurement,setpoints=['x'])
+    try:
+        for i in range(N):
+            source.value=float(i)
+            probe.points.append(float(i))
+            pipeline.submit(q)
+        pipeline.close()
+    finally:
+        measurement.close()
+    return(records_to_dataframe(np.concatenate([q.get() for i in range(q.qsize())])))
+
+def test_pipeline_keeps_setpoints_and_readings_paired():
+    source=Source()
+    probe=Probe(source)
+    df=pipelined_run({'x':[source,'value'],'y':[probe,'signal'],
+                      'b':[probe,'buffer',{'pipeline':True}]},source,probe)
+    assert list(df['x'])==[float(i) for i in range(10)]
+    assert list(df['y'])==list(df['x'])
+    assert list(df['b'])==list(df['x'])
+
+def test_pipeline_deferred_keys():
+    source=Source()
+    probe=Probe(source)
+    measurement=Measurement({'x':[source,'value'],'y':[probe,'signal'],'b':[probe,'buffer',{'pipeline':True}]})
+    pipeline=Measurement_Pipeline(measurement,setpoints=['x'])
+    try:
+        assert pipeline.immediate==['x','y'] and pipeline.deferred==['b']
+        assert not(pipeline.shared_bus)
+    finally:
+        pipeline.close()
+        measurement.close()
+
+class Connection(object):
+    def __init__(self,resource_name=None):
+        if resource_name!=None:
+            self.resource_name=resource_name
+
+class Adapter(object):
+    def __init__(self,connection):
+        self.connection=connection
+
+class Bus_Instrument(object):
+    """
+        Fake instrument on a bus
+    """
+    def __init__(self,resource_name=None,adapter=None):
+        self.adapter=adapter if adapter!=None else Adapter(Connection(resource_name))
+        self.value=1.0
+
+def test_group_by_bus():
+    serial=Adapter(Connection())
+    instruments={'a':Bus_Instrument('ASRL4::INSTR'),'b':Bus_Instrument('asrl4::INSTR'),
+                 'c':Bus_Instrument('GPIB0::5::INSTR'),'d':Bus_Instrument('GPIB0::7::INSTR'),
+                 'e':Bus_Instrument('GPIB1::5::INSTR'),'f':Bus_Instrument('TCPIP::192.168.0.2::INSTR'),
+                 'g':Bus_Instrument('TCPIP::192.168.0.3::INSTR'),'h':Bus_Instrument(adapter=serial),
+                 'i':Bus_Instrument(adapter=serial),'j':Bus_Instrument(),'k':Source()}
+    measurement=Measurement({key:[instru,'value'] for key,instru in instruments.items()})
+    try:
+        assert sorted(measurement.groups)==[['a','b'],['c','d'],['e'],['f'],['g'],['h','i'],['j'],['k']]
+        assert measurement.take().shape==(1,11)
+    finally:
+        measurement.close()
+
+def test_cached_key_timestamps():
+    instru=Counter()
+    measure=Measurement({'Vg':[instru,'setpoint'],'T':[instru,'signal',{'ttl':100.0}]},record=True,
+                        timestamps=True)
+    try:
+        first=measure.take()
+        time.sleep(0.01)
+        second=measure.take()
+        assert instru.reads=={'setpoint':2,'signal':1}
+        assert second['T'][0]==first['T'][0]
+        # the cached value keeps the time of its read
+        assert second['T_start'][0]==first['T_start'][0] and second['T_end'][0]==first['T_end'][0]
+        assert second['T_end'][0]<second['Vg_start'][0]
+    finally:
+        measure.close()
+
+def wait_for(condition,timeout=5):
+    t0=time.monotonic()
+    while not(condition()):
+        assert time.monotonic()-t0<timeout
+        time.sleep(0.005)
+
+def test_ttl_background_refresh():
+    instru=Counter()
+    measure=Measurement({'T':[instru,'signal',{'ttl':0.05}]},record=True)
+    try:
+        assert measure.take()['T'][0]==1.0
+        assert measure.take()['T'][0]==1.0 and instru.reads['signal']==1
+        time.sleep(0.1)
+        # the old value is returned and the refresh is done in the background
+        assert measure.take()['T'][0]==1.0
+        wait_for(lambda: not(measure.refreshing) and instru.reads['signal']==2)
+        assert measure.take()['T'][0]==2.0
+    finally:
+        measure.close()
+
+class Failing_Counter(Counter):
+    """
+        Fake instrument failing after its first read
+    """
+    @property
+    def signal(self):
+        self.reads['signal']+=1
+        if self.reads['signal']>1:
+            raise IOError('no answer')
+        return(1.0)
+
+def test_ttl_refresh_error_keeps_the_value():
+    instru=Failing_Counter()
+    measure=Measurement({'T':[instru,'signal',{'ttl':0.01}]},record=True)
+    try:
+        measure.take()
+        time.sleep(0.05)
+        measure.take()
+        wait_for(lambda: not(measure.refreshing) and instru.reads['signal']==2)
+        assert measure.take()['T'][0]==1.0
+    finally:
+        measure.close()
+
+def test_shared_executor_not_shut_down_by_close():
+    executor=ThreadPoolExecutor(max_workers=2)
+    instru=Counter()
+    try:
+        for i in range(2):
+            measure=Measurement({'I':[instru,'signal']},record=True,executor=executor)
+            assert measure.executor is executor and not(measure.own_executor)
+            measure.take()
+            measure.close()
+        # the pool is still usable by the next measurements
+        assert executor.submit(lambda: 1).result(5)==1
+        assert instru.reads['signal']==2
+    finally:
+        executor.shutdown()
+    # a shut down shared pool is not used by a new measurement
+    measure=Measurement({'I':[instru,'signal']},executor=executor)
+    with pytest.raises(RuntimeError):
+        measure.take()
+
+def test_own_executor_shut_down_by_close():
+    measure=Measurement({'I':[Counter(),'signal']},record=True)
+    assert measure.own_executor
+    measure.take()
+    measure.close()
+    with pytest.raises(RuntimeError):
+        measure.executor.submit(lambda: 1)
+
+class Trace(object):
+    """
+        Fake instrument with a scalar and a tabular quantity
+    """
+    value=0.5
+    trace=np.array([1.0,2.0,3.0])
+
+def take(format):
+    instru=Trace()
+    measure=Measurement({'V':[instru,'value'],'X':[instru,'trace']},format=format)
+    try:
+        return(measure.take())
+    finally:
+        measure.close()
+
+def test_format_line():
+    expected=pd.DataFrame({'V':[0.5],'X_0':[1.0],'X_1':[2.0],'X_2':[3.0]})
+    pd.testing.assert_frame_equal(take('line'),expected)
+
+def test_format_line_multi():
+    columns=pd.MultiIndex.from_tuples([('V',0),('X',0),('X',1),('X',2)])
+    expected=pd.DataFrame([[0.5,1.0,2.0,3.0]],columns=columns)
+    pd.testing.assert_frame_equal(take('line_multi'),expected)
+
+def test_format_col():
+    expected=pd.DataFrame({'V':[0.5,np.nan,np.nan],'X':[1.0,2.0,3.0]})
+    pd.testing.assert_frame_equal(take('col'),expected)
+
+def test_format_col_multi():
+    expected=pd.DataFrame({'V':[0.5,0.5,0.5],'X':[1.0,2.0,3.0]})
+    pd.testing.assert_frame_equal(take('col_multi'),expected)
@@ -0,0 +1,66 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import numpy as np
+import pandas as pd
+
+from pymeso.utils.measure import Row_Encoder,records_to_dataframe
+from pymeso.utils.utility import Data_Saver
+
+def test_scalar_types_are_kept():
+    encoder=Row_Encoder(['x','n','flag','name'])
+    record=encoder.encode({'x':1.5,'n':3,'flag':True,'name':'a'})
+    assert record.dtype['x'].kind=='f'
+    assert record.dtype['n'].kind=='i'
+    assert record.dtype['flag'].kind=='b'
+    assert record.dtype['name'].kind=='O'
+    assert records_to_dataframe(record).to_csv(index=False)=='x,n,flag,name\n1.5,3,True,a\n'
+
+def test_vector_field():
+    encoder=Row_Encoder(['x','trace'])
+    records=np.concatenate([encoder.encode({'x':float(i),'trace':np.arange(3)+i}) for i in range(2)])
+    df=records_to_dataframe(records)
+    assert list(df.columns)==['x','trace_0','trace_1','trace_2']
+    assert df['trace_2'].tolist()==[2,3]
+
+def test_type_change_compiles_object_field():
+    encoder=Row_Encoder(['x','v'])
+    first=encoder.encode({'x':0.0,'v':1.25})
+    second=encoder.encode({'x':1.0,'v':'OVERLOAD'})
+    third=encoder.encode({'x':2.0,'v':2.5})
+    assert first.dtype['v'].kind=='f'
+    assert second.dtype['v'].kind=='O' and third.dtype['v'].kind=='O'
+    assert second['v'][0]=='OVERLOAD' and third['v'][0]==2.5
+
+def test_records_written_as_baseline(tmp_path):
+    file=tmp_path/'data.dat'
+    encoder=Row_Encoder(['n','flag','v'])
+    saver=Data_Saver(str(file),header='# TIME : test\n')
+    for i,v in enumerate([1.5,'OVERLOAD',2.0]):
+        saver.put(encoder.encode({'n':i,'flag':i%2==0,'v':v}))
+    saver.close()
+    assert saver.done.wait(10)
+    lines=file.read_text().splitlines()
+    assert lines[1:]==['n,flag,v','0,True,1.5','1,False,OVERLOAD','2,True,2.0']
@@ -0,0 +1,287 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+from pymeso.utils.utility import AdaptiveSteps,LinSteps,LinSweep,Sweep
+
+class Source(object):
+    """
+        Fake instrument with a settable value
+    """
+    def __init__(self):
+        self.value=0.0
+
+class RampSource(Source):
+    """
+        Fake instrument with a hardware ramp
+    """
+    def __init__(self):
+        super().__init__()
+        self.ramps=[]
+        
+    def value_ramp(self,start,stop,rate):
+        self.ramps.append((start,stop,rate))
+        return(abs(stop-start)/rate)
+        
+    def value_ramp_stop(self):
+        pass
+
+class WriteSource(object):
+    """
+        Fake instrument recording the values written
+    """
+    def __init__(self):
+        self.writes=[]
+        
+    @property
+    def value(self):
+        return(self.writes[-1] if self.writes else 0.0)
+        
+    @value.setter
+    def value(self,value):
+        self.writes.append(value)
+
+class SlowSource(Source):
+    """
+        Fake instrument taking 0.2 s to set its value
+    """
+    @property
+    def value(self):
+        return(self._value)
+        
+    @value.setter
+    def value(self,value):
+        time.sleep(0.2)
+        self._value=value
+
+class LimitedRampSource(WriteSource):
+    """
+        Fake instrument with a hardware ramp accepting only the first programs,
+        counting its aborted programs
+    """
+    def __init__(self,ramps=1):
+        super().__init__()
+        self.accepted=ramps
+        self.ramps=[]
+        self.aborted=0
+        
+    def value_ramp(self,start,stop,rate):
+        self.ramps.append((start,stop,rate))
+        if len(self.ramps)>self.accepted:
+            return(None)
+        return(abs(stop-start)/rate)
+        
+    def value_ramp_stop(self):
+        self.aborted+=1
+
+def run(stepper,signal=None,timeout=10):
+    """
+        Drive the stepper as Experiment.work_stepper and give the data to observe, 
+        return the setpoints in the order of acquisition
+    """
+    setpoints=[]
+    stepper.initialize()
+    stepper.initial_step()
+    assert stepper.wait_idle(timeout)
+    while True:
+        x=stepper.device[0].value
+        if signal!=None:
+            stepper.observe(pd.DataFrame({'x':[x],'I':[signal(x)]}))
+        setpoints.append(x)
+        if stepper.finished:
+            break
+        stepper.next_step()
+        assert stepper.wait_idle(timeout)
+    return(np.array(setpoints))
+
+def test_adaptive_refines_around_the_step():
+    stepper=AdaptiveSteps([Source(),'value'],0,1,11,0,'I',max_points=30)
+    setpoints=run(stepper,lambda x: float(x>0.43))
+    assert len(setpoints)==len(set(setpoints))
+    added=setpoints[11:]
+    assert len(added)==19
+    # the curvature refines the neighbours of the step first, then the step only
+    assert np.all((added>0.3) & (added<0.6))
+    assert np.all((added[6:]>0.4) & (added[6:]<0.5))
+
+def test_adaptive_does_not_refine_flat_signal():
+    stepper=AdaptiveSteps([Source(),'value'],0,1,11,0,'I',max_points=30)
+    setpoints=run(stepper,lambda x: 1.0)
+    assert len(setpoints)==11
+
+def test_adaptive_max_step_and_min_step():
+    stepper=AdaptiveSteps([Source(),'value'],0,1,3,0,'I',max_points=30,max_step=0.2,min_step=0.05)
+    setpoints=np.sort(run(stepper,lambda x: 1.0))
+    assert np.all(np.diff(setpoints)<=0.2)
+    assert np.all(np.diff(setpoints)>=0.05)
+
+def test_adaptive_skips_missing_data():
+    stepper=AdaptiveSteps([Source(),'value'],0,1,11,0,'I',max_points=30)
+    signal=lambda x: np.nan if abs(x-0.1)<1e-9 else float(x>0.73)
+    setpoints=run(stepper,signal)
+    added=setpoints[11:]
+    assert len(added)==19
+    assert np.all((added>0.6) & (added<0.9))
+    
+def test_adaptive_sweep_down():
+    stepper=AdaptiveSteps([Source(),'value'],1,0,11,0,'I',max_points=20,batch=3)
+    setpoints=run(stepper,lambda x: float(x>0.43))
+    added=setpoints[11:14]
+    assert np.all(np.diff(added)<=0)
+
+def test_sweep_hardware_ramp_monotonic_clock(monkeypatch):
+    # the wall clock does not move : the ramp is timed with the monotonic clock
+    monkeypatch.setattr(time,'time',lambda: 0.0)
+    source=RampSource()
+    sweep=Sweep('ramp',source,'value')
+    sweep.timestep=10
+    sweep.sweep(0.0,0.2,1.0)
+    finished=sweep.done.wait(5)
+    sweep.stop()
+    assert finished
+    assert source.ramps==[(0.0,0.2,1.0)]
+    assert source.value==0.2 and sweep.progress==1.0
+
+def test_sweep_zero_length(caplog):
+    source=WriteSource()
+    sweep=Sweep('zero',source,'value')
+    with caplog.at_level(logging.DEBUG):
+        sweep.sweep(0.3,0.3,1.0).result(5)
+    sweep.close()
+    assert source.writes==[]
+    assert sweep.value==0.3 and sweep.progress==1.0
+    assert sweep.achieved_rate==None and caplog.records==[]
+
+def test_sweep_report_rate_level(caplog):
+    sweep=Sweep('slow',Source(),'value')
+    sweep.value=0.1
+    with caplog.at_level(logging.DEBUG):
+        # short sweep : debug level only
+        sweep.report_rate(0.0,1.0,0.5)
+        sweep.value=1.0
+        sweep.report_rate(0.0,1.0,2.0)
+    assert [record.levelno for record in caplog.records]==[logging.DEBUG,logging.INFO]
+    assert sweep.achieved_rate==0.5
+
+def test_stepper_shutdown_stops_the_worker_threads():
+    threads=threading.active_count()
+    for stepper in [LinSteps([Source(),'value'],0,1,5,0),LinSweep([Source(),'value'],0,1,100,5)]:
+        for i in range(2):
+            setpoints=run(stepper)
+            assert list(setpoints)==[0.0,0.25,0.5,0.75,1.0]
+            assert threading.active_count()>threads
+            stepper.shutdown()
+            assert threading.active_count()==threads
+
+def test_wait_idle_returns_at_the_end_of_the_step():
+    stepper=LinSteps([SlowSource(),'value'],0,1,5,0)
+    try:
+        stepper.initialize()
+        stepper.initial_step()
+        assert stepper.wait_idle(5)
+        t0=time.monotonic()
+        stepper.next_step()
+        # busy is set before the step is started
+        assert stepper.busy and not(stepper.wait_idle(0.05))
+        assert stepper.wait_idle(5)
+        assert time.monotonic()-t0<0.35
+        assert stepper.device[0].value==0.25 and not(stepper.busy)
+    finally:
+        stepper.shutdown()
+
+def test_wait_function_interrupted_by_stop():
+    stepper=LinSteps([Source(),'value'],0,1,5,0)
+    timer=threading.Timer(0.1,stepper.should_stop.set)
+    timer.start()
+    t0=time.monotonic()
+    stepper.wait_function(10)
+    assert time.monotonic()-t0<2
+    timer.join()
+
+def test_sweep_without_hardware_ramp():
+    source=WriteSource()
+    sweep=Sweep('soft',source,'value')
+    assert not(sweep._rampable)
+    sweep.timestep=10
+    sweep.sweep(0.0,0.05,1.0).result(5)
+    sweep.close()
+    assert len(source.writes)>2 and source.writes[-1]==0.05
+
+def test_sweep_hardware_ramp_dispatch():
+    source=LimitedRampSource()
+    sweep=Sweep('ramp',source,'value')
+    assert sweep._rampable
+    sweep.timestep=10
+    sweep.sweep(0.0,0.05,1.0).result(5)
+    sweep.close()
+    # the program does the ramp, the final value is set at the end
+    assert source.ramps==[(0.0,0.05,1.0)] and source.writes==[0.05]
+
+def test_sweep_hardware_ramp_fallback():
+    source=LimitedRampSource(ramps=0)
+    sweep=Sweep('ramp',source,'value')
+    sweep.timestep=10
+    sweep.sweep(0.0,0.05,1.0).result(5)
+    sweep.close()
+    # the instrument can not do the ramp : software sweep
+    assert source.ramps==[(0.0,0.05,1.0)]
+    assert len(source.writes)>2 and source.writes[-1]==0.05
+
+def test_sweep_hardware_ramp_pause():
+    for accepted,software in [(2,False),(1,True)]:
+        source=LimitedRampSource(ramps=accepted)
+        sweep=Sweep('ramp',source,'value')
+        sweep.timestep=10
+        future=sweep.sweep(0.0,0.3,1.0)
+        time.sleep(0.05)
+        sweep.pause(True)
+        time.sleep(0.05)
+        sweep.pause(False)
+        future.result(5)
+        sweep.close()
+        # the program is aborted by the pause and uploaded again from the current value
+        assert source.aborted==1
+        assert len(source.ramps)==2 and source.ramps[1]==(0.0,0.3,1.0)
+        # software sweep if the instrument can not do the second ramp
+        assert (len(source.writes)>1)==software and source.writes[-1]==0.3
+
+def test_sweep_hardware_ramp_stop():
+    source=LimitedRampSource()
+    sweep=Sweep('ramp',source,'value')
+    sweep.timestep=10
+    future=sweep.sweep(0.0,10.0,1.0)
+    time.sleep(0.05)
+    t0=time.monotonic()
+    sweep.stop()
+    future.result(5)
+    sweep.close()
+    assert time.monotonic()-t0<1
+    assert source.aborted==1 and source.writes==[]
+
@@ -23,11 +23,13 @@
 # THE SOFTWARE.
 #
 
-from .measure import Measurement
+from .measure import Measurement,Measurement_Pipeline,Latency_Histogram
 from .plotter_forQTinterface import Plotter
 from .logger import set_logger
 from .spy import Spy
-from .utility import myTimer,Sweep,Data_Saver,ExperimentError,Alias
-from .utility import LinSteps,LogSteps,ArraySteps,LinSweep,FlySweep
+from .utility import myTimer,Sweep,Data_Saver,Data_Buffer,Writer_Service,ExperimentError,Alias
+from .utility import LinSteps,LogSteps,ArraySteps,AdaptiveSteps,LinSweep,FlySweep
 from .utility import message_box
-from .plotter_in_notebook import Plotter_in_Notebook
\ No newline at end of file
+from .plotter_in_notebook import Plotter_in_Notebook
+from .data_file import read_data_file,Data_File
+from .async_engine import Async_Engine
\ No newline at end of file
@@ -0,0 +1,188 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import logging
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+import asyncio
+from threading import Thread
+from functools import partial
+
+class Async_Engine(object):
+    """
+        Process-wide asyncio event loop running in its own thread.
+        The coroutines of several experiments (see run_multisweep) can be run 
+        concurrently in the loop. The blocking calls (instrument reads and writes) 
+        are done in an executor, the threads are reused from one point to the next.
+        The adapters are used as they are (synchronous), and the Data_Saver and the 
+        interface keep their own threads : the loop drives the steppers, the waits 
+        and the measurements.
+        
+        EXAMPLES :
+            engine=Async_Engine.get()
+            future=engine.submit(coroutine)     # concurrent.futures.Future
+            result=engine.run(coroutine)        # wait for the result
+    """
+    instance=None
+    
+    @classmethod
+    def get(cls):
+        """
+            Return the engine of the process, start it if needed
+        """
+        if cls.instance==None:
+            cls.instance=Async_Engine()
+        return(cls.instance)
+    
+    def __init__(self):
+        self.loop=asyncio.new_event_loop()
+        self.thread=Thread(name='Async_Engine',target=self.work,daemon=True)
+        self.thread.start()
+        
+    def work(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        
+    def submit(self,coroutine):
+        """
+            Schedule the coroutine in the loop and return a concurrent.futures.Future
+        """
+        return(asyncio.run_coroutine_threadsafe(coroutine,self.loop))
+    
+    def run(self,coroutine):
+        """
+            Run the coroutine in the loop and return its result
+        """
+        return(self.submit(coroutine).result())
+    
+async def call(executor,function,*args,**kwargs):
+    """
+        Call a blocking function in the executor (default executor of the loop if None)
+    """
+    loop=asyncio.get_running_loop()
+    return(await loop.run_in_executor(executor,partial(function,*args,**kwargs)))
+
+async def take(measurement,preset=None):
+    """
+        Take the measurements of a Measurement, the groups of keys (one per bus) 
+        are measured concurrently in the executor of the Measurement
+    """
+    results,stamps,groups=measurement.start_take(preset)
+    outputs=await asyncio.gather(*[call(measurement.executor,measurement.measure_group,keys) 
+                                   for keys in groups])
+    return(measurement.end_take(results,stamps,groups,outputs))
+
+async def wait_stop(interface,timeout):
+    """
+        Wait timeout (in s), return True as soon as the interface is stopped
+    """
+    if interface==None:
+        await asyncio.sleep(timeout)
+        return(False)
+    # the Event of the interface is waited in the default executor of the loop
+    return(await call(None,interface.should_stop.wait,timeout))
+
+async def check_pause_and_stop(steppers,interface):
+    """
+        Wait while the interface is paused, return True if it is stopped
+    """
+    if interface==None:
+        return(False)
+    while interface.should_pause.is_set():
+        if await wait_stop(interface,0.1):
+            break
+    if interface.should_stop.is_set():
+        for stepper in steppers:
+            stepper.stop()
+        return(True)
+    return(False)
+
+async def run_multisweep(steppers,measurement,q,wait_time,wait=True,
+                         journal=False,interface=None,executor=None):
+    """
+        Coroutine doing the multisweep of the steppers (LinSweep, LinSteps, LogSteps, 
+        ArraySteps) : the first stepper is the outer loop. At each point the data 
+        are measured with take and put in q (queue or Data_Saver), with the checkpoint 
+        of the steppers if journal is True. The moves and the reads are done in the 
+        executor. The waits are interrupted by a stop of the interface. 
+        Return True if the multisweep has been stopped.
+    """
+    async def point():
+        if wait and await wait_stop(interface,wait_time):
+            return
+        df=await take(measurement)
+        for stepper in steppers:
+            if hasattr(stepper,'observe'):
+                stepper.observe(df)
+        if journal:
+            checkpoint={'index':[stepper.sweep_index for stepper in steppers],
+                        'forward':[stepper.forward for stepper in steppers]}
+            await call(executor,q.put,(df,checkpoint))
+        else:
+            await call(executor,q.put,df)
+    
+    def show(stepper):
+        if interface!=None:
+            interface.set_stepper_value(stepper.name,stepper.current_value)
+    
+    async def run(level):
+        stepper=steppers[level]
+        stepper.initialize()
+        if interface!=None:
+            interface.set_stepper_status(stepper.name,stepper.status,stepper.mode)
+        await call(executor,stepper.work_set_initial_value)
+        stepper.status='forward' if stepper.forward else 'backward'
+        if interface!=None:
+            interface.set_stepper_status(stepper.name,stepper.status,stepper.mode)
+        show(stepper)
+        while True:
+            if await check_pause_and_stop(steppers,interface):
+                return(True)
+            if level==len(steppers)-1:
+                await point()
+            elif await run(level+1):
+                return(True)
+            if stepper.finished:
+                break
+            stepper.index+=1
+            await call(executor,stepper.work_set_value,stepper.sweep_values[stepper.index])
+            show(stepper)
+        # finalize the run (same as the finalize methods, without a new thread)
+        if stepper.back and stepper.sweep_values[0]!=stepper.current_value:
+            stepper.status='back'
+            if interface!=None:
+                interface.set_stepper_status(stepper.name,stepper.status,stepper.mode)
+            if hasattr(stepper,'work_set_back_value'):
+                await call(executor,stepper.work_set_back_value)
+            else:
+                stepper.index=stepper.Nvalues
+                await call(executor,stepper.work_set_value,stepper.sweep_values[0])
+            show(stepper)
+        if stepper.mode=='serpentine':
+            stepper.forward=not(stepper.forward)
+        return(False)
+    
+    return(await run(0))
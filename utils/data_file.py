@@ -0,0 +1,396 @@
+#
+# This file is part of the PyMeso package.
+#
+# Copyright (c) R. Deblock, Mesoscopic Physics Group 
+# Laboratoire de Physique des Solides, Université Paris-Saclay, Orsay, France.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import logging
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+import numpy as np
+import pandas as pd
+import gzip,bz2,lzma,zlib,io,os,mmap
+
+try:
+    import h5py
+except ImportError:
+    h5py=None
+
+def is_hdf_file(file):
+    """
+        Return True if the file is a hdf file written by Data_Saver
+    """
+    if h5py==None:
+        return False
+    try:
+        return(h5py.is_hdf5(file))
+    except:
+        return False
+
+def open_data_file(file,mode='r'):
+    """
+        Open a text data file using the compression format depending on the
+        extension of the file ( ‘.gz’, ‘.bz2’, ‘.xz’, ...)
+    """
+    file_handler={'gz':gzip.open,'bz2':bz2.open,'xz':lzma.open}
+    extension=file.split('.')[-1]
+    if extension in ('gz','bz2','xz'):
+        return(file_handler[extension](file,mode+'t'))
+    else:
+        return(open(file,mode))
+
+class Stream_Reader(object):
+    """
+        Read a text data file, compressed or not, while it is written.
+        The compressed stream is decoded incrementally so that a file which 
+        is not closed yet (no end-of-stream marker) can be read.
+        Each call of read() returns the new complete lines of the file.
+        
+        EXAMPLE :
+            reader=Stream_Reader('data.dat.gz')
+            text=reader.read()      # text of the file
+            text=reader.read()      # new lines written since the last call
+    """
+    def __init__(self,file):
+        self.file=file
+        self.extension=file.split('.')[-1]
+        # position in the raw file
+        self.offset=0
+        # incomplete last line
+        self.remainder=b''
+        self.decompressor=self.new_decompressor()
+        
+    def new_decompressor(self):
+        """
+            Return a decompressor object depending on the extension of the file
+        """
+        if self.extension=='gz':
+            return(zlib.decompressobj(wbits=31))
+        elif self.extension=='bz2':
+            return(bz2.BZ2Decompressor())
+        elif self.extension=='xz':
+            return(lzma.LZMADecompressor())
+        else:
+            return(None)
+    
+    def decompress(self,raw):
+        """
+            Decompress the raw bytes. Successive compressed members are handled.
+        """
+        if self.decompressor==None:
+            return(raw)
+        output=[]
+        while len(raw)>0:
+            output.append(self.decompressor.decompress(raw))
+            if self.decompressor.eof:
+                raw=self.decompressor.unused_data
+                self.decompressor=self.new_decompressor()
+            else:
+                raw=b''
+        return(b''.join(output))
+        
+    def read(self):
+        """
+            Return the new complete lines of the file as a string
+        """
+        with open(self.file,'rb') as f:
+            f.seek(self.offset)
+            raw=f.read()
+        self.offset+=len(raw)
+        data=self.remainder+self.decompress(raw)
+        index=data.rfind(b'\n')+1
+        self.remainder=data[index:]
+        return(data[:index].decode())
+
+def is_compressed_file(file):
+    """
+        Return True if the extension of the file corresponds to a compressed file
+    """
+    return(file.split('.')[-1] in ('gz','bz2','xz'))
+
+def hdf_to_dataframe(f,columns,start,stop):
+    """
+        Return a dataframe with the rows start to stop-1 of the datasets columns of the 
+        hdf file f. The 2D datasets (tabular data) are given as the columns name_i.
+    """
+    frames=[]
+    data={}
+    for name in columns:
+        dset=f[name]
+        if dset.ndim==2:
+            if len(data)>0:
+                frames.append(pd.DataFrame(data))
+                data={}
+            frames.append(pd.DataFrame(dset[start:stop],columns=[name+'_'+str(i) for i in range(dset.shape[1])]))
+        elif h5py.check_string_dtype(dset.dtype) != None:
+            data[name]=dset.asstr()[start:stop]
+        else:
+            data[name]=dset[start:stop]
+    if len(data)>0 or len(frames)==0:
+        frames.append(pd.DataFrame(data,columns=list(data.keys())))
+    if len(frames)==1:
+        return(frames[0])
+    return(pd.concat(frames,axis=1))
+    
+def read_hdf(file):
+    """
+        Read a hdf file written by Data_Saver and return (header, dataframe).
+        The file can be read while it is written (SWMR mode).
+    """
+    with h5py.File(file,'r',libver='latest',swmr=True) as f:
+        header=f.attrs.get('header','')
+        columns=list(f.attrs.get('columns',[]))
+        # all the columns are cut to the same length in case of a write in progress
+        for name in columns:
+            f[name].refresh()
+        N=min([f[name].shape[0] for name in columns],default=0)
+        data=hdf_to_dataframe(f,columns,0,N)
+    return((header,data))
+
+def read_header(file):
+    """
+        Read the header of the file and return (header_length, header_str)
+    """
+    if is_hdf_file(file):
+        header=read_hdf(file)[0]
+        return((0,header))
+    comment='#'
+    header = ""
+    header_read = False
+    header_count = 0
+    if is_compressed_file(file):
+        f=io.StringIO(Stream_Reader(file).read())
+    else:
+        f=open_data_file(file)
+    with f:
+        while not header_read:
+            line = f.readline()
+            if line.startswith(comment):
+                header += line.strip() + '\n'
+                header_count += 1
+            else:
+                header_read = True
+    return((header_count,header))
+
+def read_data_file(file):
+    """
+        Read a data file (csv, compressed csv or hdf) and return a dataframe
+    """
+    if is_hdf_file(file):
+        return(read_hdf(file)[1])
+    elif is_compressed_file(file):
+        return(pd.read_csv(io.StringIO(Stream_Reader(file).read()),comment='#',header=0))
+    else:
+        return(pd.read_csv(file,comment='#',header=0))
+
+class Data_File(object):
+    """
+        Read a text data file written by pymeso (not compressed) through a memory map.
+        The offsets of the rows are indexed once and can be cached in the sidecar file 
+        file+'.idx.npz' together with the header, so that the file is opened again 
+        without parsing it. Only the requested rows or columns are parsed.
+        The index is rebuilt if the file has been modified, or extended if data 
+        have been appended (call refresh() for a file which is written).
+        
+        OPTIONS :
+            - cache : if True, the index is saved in the sidecar file. Default : False
+            
+        EXAMPLES :
+            data=Data_File('test_multisweep.dat',cache=True)
+            len(data)                       # number of rows
+            data.columns                    # name of the columns
+            data.config['MEASURE']          # lines of the section MEASURE of the header
+            df=data.rows(1000,2000)         # dataframe with the rows 1000 to 1999
+            x=data.column('Vbias',0,100)    # numpy array with the first 100 values of Vbias
+            data.close()
+    """
+    def __init__(self,file,cache=False):
+        self.file=file
+        self.index_file=file+'.idx.npz'
+        self.cache=cache
+        self._file=None
+        self._map=None
+        self.header=''
+        self.columns=[]
+        # offsets of the start of the rows, the last element is the end of the last complete row
+        self.offsets=np.zeros(1,dtype=np.int64)
+        self.open_map()
+        if not(self.load_index()):
+            self.build_index()
+            
+    def __len__(self):
+        return(len(self.offsets)-1)
+        
+    def __enter__(self):
+        return(self)
+    
+    def __exit__(self,*args):
+        self.close()
+    
+    def open_map(self):
+        """
+            Internal function :
+            Memory map the file
+        """
+        self.close()
+        self._file=open(self.file,'rb')
+        self.size=os.fstat(self._file.fileno()).st_size
+        self.mtime=os.fstat(self._file.fileno()).st_mtime_ns
+        if self.size>0:
+            self._map=mmap.mmap(self._file.fileno(),0,access=mmap.ACCESS_READ)
+        
+    def load_index(self):
+        """
+            Internal function :
+            Load the index from the sidecar file, return False if it is not valid
+        """
+        if not(self.cache):
+            return False
+        try:
+            with np.load(self.index_file,allow_pickle=False) as index:
+                size=int(index['size'])
+                mtime=int(index['mtime'])
+                offsets=index['offsets']
+                header=str(index['header'])
+                columns=index['columns'].tolist()
+        except:
+            return False
+        if size>self.size or (size==self.size and mtime!=self.mtime):
+            return False
+        self.header=header
+        self.columns=columns
+        self.offsets=offsets
+        if size<self.size:
+            # data appended since the index was saved
+            self.extend_index()
+            self.save_index()
+        return True
+    
+    def save_index(self):
+        """
+            Internal function :
+            Save the index in the sidecar file
+        """
+        if not(self.cache):
+            return
+        try:
+            with open(self.index_file,'wb') as f:
+                np.savez(f,size=self.size,mtime=self.mtime,offsets=self.offsets,
+                         header=np.array(self.header),columns=np.array(self.columns,dtype=str))
+        except:
+            log.warning('Cannot save the index of {}'.format(self.file))
+            
+    def build_index(self):
+        """
+            Internal function :
+            Read the header and the column names, then index the rows
+        """
+        if self._map==None:
+            return
+        position=0
+        header=[]
+        while position<self.size and self._map[position:position+1]==b'#':
+            end=self._map.find(b'\n',position)
+            if end<0:
+                return
+            header.append(self._map[position:end].decode().strip())
+            position=end+1
+        end=self._map.find(b'\n',position)
+        if end<0:
+            return
+        self.header='\n'.join(header)+'\n' if len(header)>0 else ''
+        self.columns=self._map[position:end].decode().strip().split(',')
+        self.offsets=np.array([end+1],dtype=np.int64)
+        self.extend_index()
+        self.save_index()
+        
+    def extend_index(self,block_size=2**26):
+        """
+            Internal function :
+            Index the complete rows after the last indexed one, by blocks of block_size bytes
+        """
+        if self._map==None:
+            return
+        start=int(self.offsets[-1])
+        new=[self.offsets]
+        for position in range(start,self.size,block_size):
+            block=np.frombuffer(self._map[position:position+block_size],dtype=np.uint8)
+            new.append(np.flatnonzero(block==10).astype(np.int64)+position+1)
+        self.offsets=np.concatenate(new)
+        
+    def refresh(self):
+        """
+            Map the file again and index the rows written since the last call
+        """
+        size=self.size
+        self.open_map()
+        if self.size<size or len(self.columns)==0:
+            self.offsets=np.zeros(1,dtype=np.int64)
+            self.build_index()
+        elif self.size>size:
+            self.extend_index()
+            self.save_index()
+    
+    @property
+    def config(self):
+        """
+            Return the header as a dictionnary {section:[lines]}, the sections are the 
+            header lines with one uppercase word (TIME, MULTISWEEP, MEASURE, CONFIG, ...)
+        """
+        config={}
+        section=None
+        for line in self.header.split('\n'):
+            line=line.lstrip('#').strip()
+            if line.isupper() and len(line.split())==1 and line.isalpha():
+                section=line
+                config[section]=[]
+            elif section!=None and line!='':
+                config[section].append(line)
+        return(config)
+            
+    def rows(self,start=0,stop=None,columns=None):
+        """
+            Return a dataframe with the rows start to stop-1 (and only the listed columns if provided)
+        """
+        start,stop,step=slice(start,stop).indices(len(self))
+        if stop<=start:
+            return(pd.DataFrame(columns=self.columns if columns==None else columns))
+        raw=self._map[int(self.offsets[start]):int(self.offsets[stop])]
+        return(pd.read_csv(io.BytesIO(raw),header=None,names=self.columns,usecols=columns,comment='#'))
+    
+    def column(self,name,start=0,stop=None):
+        """
+            Return a numpy array with the values of the column 'name' from row start to stop-1
+        """
+        return(self.rows(start,stop,columns=[name])[name].to_numpy())
+        
+    def close(self):
+        """
+            Close the memory map and the file
+        """
+        if self._map!=None:
+            self._map.close()
+            self._map=None
+        if self._file!=None:
+            self._file.close()
+            self._file=None
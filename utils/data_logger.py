@@ -35,12 +35,12 @@ class Data_logger(object):
         Object launching a logger process
     """
     
-    def __init__(self, wait_time, measure_dict, interface=None):
+    def __init__(self, wait_time, measure_dict, interface=None, executor=None):
         self.wait_time=max(1,int(wait_time))
         self.set_measure_dict(measure_dict)
         self.meas_object_dict={}
         for group in self.measure_dict.keys():
-            self.meas_object_dict[group]=Measurement(self.measure_dict[group],format='col')
+            self.meas_object_dict[group]=Measurement(self.measure_dict[group],format='col',executor=executor)
         self.start_logger()
         
            
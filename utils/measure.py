@@ -30,81 +30,685 @@ log.addHandler(logging.NullHandler())
 import pandas as pd
 import numpy as np
 import time
+import bisect
+from threading import Lock
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial,lru_cache
 
+@lru_cache(maxsize=256)
+def vector_columns(key,N):
+    """
+        Return the labels key_0 ... key_N-1 of the columns of tabular data
+    """
+    return(tuple(key+'_'+str(i) for i in range(N)))
+
+def records_to_dataframe(records):
+    """
+        Convert structured records (see Row_Encoder) in a dataframe, the vector 
+        fields are converted as blocks of columns key_0 ... key_N-1
+    """
+    if all(len(records.dtype[name].shape)==0 for name in records.dtype.names):
+        return(pd.DataFrame(records))
+    frames=[]
+    scalars={}
+    for name in records.dtype.names:
+        shape=records.dtype[name].shape
+        if len(shape)==0:
+            scalars[name]=records[name]
+            continue
+        if len(scalars)>0:
+            frames.append(pd.DataFrame(scalars))
+            scalars={}
+        block=records[name].reshape(len(records),-1)
+        frames.append(pd.DataFrame(block,columns=vector_columns(name,block.shape[1])))
+    if len(scalars)>0:
+        frames.append(pd.DataFrame(scalars))
+    return(pd.concat(frames,axis=1))
+
+def pad(value,N):
+    """
+        Return value as a 1D array of length N completed with NaN
+    """
+    value=np.ravel(np.asarray(value))
+    if len(value)==N:
+        return(value)
+    if value.dtype.kind in 'biuf':
+        output=np.full(N,np.nan)
+    else:
+        output=np.full(N,np.nan,dtype=object)
+    output[:len(value)]=value
+    return(output)
+
+class Row_Encoder(object):
+    """
+        Encode the data of one measurement as a NumPy structured record with the 
+        columns of the 'line' format (label _n for the nth element of tabular data).
+        Tabular data are stored as a vector field (shape (N,)), converted in columns
+        by records_to_dataframe.
+        The layout of the record (names and types of the columns) is compiled 
+        with the first measurement and reused for the following ones. Floats, integers 
+        and booleans keep their type, the other data are stored as objects. If a key 
+        returns data of another type, the layout is compiled again with an object 
+        field for this key.
+    """
+    
+    def __init__(self,keys):
+        self.keys=list(keys)
+        self.dtype=None
+        self.layout=None
+        self.types={}
+        
+    @staticmethod
+    def field_type(value):
+        """
+            Return the type of the field used to store value (or its elements)
+        """
+        return({'f':'f8','i':'i8','u':'u8','b':'?'}.get(np.asarray(value).dtype.kind,'O'))
+        
+    def compile(self,data):
+        """
+            Compile the layout of the record from the data of a measurement. 
+            The keys which already changed of type are stored as objects.
+        """
+        fields=[]
+        layout=[]
+        for key in self.keys:
+            this_data=data[key]
+            dtype=self.field_type(this_data)
+            if self.types.get(key,dtype)!=dtype:
+                dtype='O'
+            self.types[key]=dtype
+            if np.ndim(this_data)==0:
+                fields.append((key,dtype))
+                layout.append(None)
+            else:
+                N=len(this_data)
+                fields.append((key,dtype,(N,)))
+                layout.append(N)
+        self.dtype=np.dtype(fields)
+        self.layout=layout
+        
+    def match(self,data):
+        """
+            Check that the data have the compiled layout and types
+        """
+        for key,N in zip(self.keys,self.layout):
+            if N==None:
+                if np.ndim(data[key])!=0:
+                    return False
+            elif np.ndim(data[key])==0 or len(data[key])!=N:
+                return False
+            if self.types[key]!='O' and self.field_type(data[key])!=self.types[key]:
+                return False
+        return True
+    
+    def encode(self,data):
+        """
+            Return a structured array of length 1 with the data of a measurement
+        """
+        if self.dtype==None or not(self.match(data)):
+            self.compile(data)
+        record=np.zeros(1,dtype=self.dtype)
+        for key in self.keys:
+            record[key]=data[key]
+        return(record)
+        
+class Latency_Histogram(object):
+    """
+        Histogram of the durations of the reads of one instrument, with logarithmic 
+        bins from 10 us to 1000 s (10 bins per decade). The durations below or above 
+        the range are counted in the first or last bin.
+        
+        EXAMPLES :
+            histogram=Latency_Histogram()
+            histogram.add(0.012)
+            histogram.quantile(0.99)    # upper edge of the bin of the 99th percentile
+            histogram.to_series()       # counts indexed by the upper edge of the bins
+    """
+    
+    def __init__(self,decades=(-5,3),bins_per_decade=10):
+        N=(decades[1]-decades[0])*bins_per_decade
+        self.edges=list(np.logspace(decades[0],decades[1],N+1))
+        self.lock=Lock()
+        self.reset()
+        
+    def reset(self):
+        with self.lock:
+            self.counts=[0]*(len(self.edges)+1)
+            self.count=0
+            self.total=0.0
+            self.min=np.inf
+            self.max=0.0
+        
+    def add(self,duration):
+        """
+            Add the duration of a read (in seconds)
+        """
+        with self.lock:
+            self.counts[bisect.bisect_left(self.edges,duration)]+=1
+            self.count+=1
+            self.total+=duration
+            self.min=min(self.min,duration)
+            self.max=max(self.max,duration)
+            
+    @property
+    def mean(self):
+        return(self.total/self.count if self.count>0 else np.nan)
+    
+    def quantile(self,q):
+        """
+            Return the upper edge of the bin containing the quantile q (0<=q<=1)
+        """
+        if self.count==0:
+            return(np.nan)
+        index=int(np.searchsorted(np.cumsum(self.counts),q*self.count))
+        return(float(min(self.edges[min(index,len(self.edges)-1)],self.max)))
+    
+    def summary(self):
+        """
+            Return a dict with the statistics of the reads
+        """
+        return({'count':self.count,'mean':self.mean,'min':self.min if self.count>0 else np.nan,
+                'median':self.quantile(0.5),'p90':self.quantile(0.9),'p99':self.quantile(0.99),
+                'max':self.max if self.count>0 else np.nan,'total':self.total})
+    
+    def to_series(self):
+        """
+            Return the counts as a Series indexed by the upper edge of the bins
+        """
+        return(pd.Series(self.counts,index=self.edges+[np.inf],name='count'))
+        
+class Running_Statistics(object):
+    """
+        Mean, standard deviation, min and max of samples (scalars or arrays of the same 
+        shape) updated sample by sample with the Welford algorithm.
+    """
+    
+    def __init__(self):
+        self.count=0
+        
+    def add(self,value):
+        value=np.array(value,dtype='f8')
+        self.count+=1
+        if self.count==1:
+            self.mean=value.copy()
+            self.m2=np.zeros_like(value)
+            self.min=value.copy()
+            self.max=value.copy()
+        else:
+            delta=value-self.mean
+            self.mean+=delta/self.count
+            self.m2+=delta*(value-self.mean)
+            np.minimum(self.min,value,out=self.min)
+            np.maximum(self.max,value,out=self.max)
+    
+    @property
+    def std(self):
+        if self.count<2:
+            return(np.zeros_like(self.mean))
+        return(np.sqrt(self.m2/(self.count-1)))
+    
+    def result(self):
+        """
+            Return (mean, std, min, max), as float for scalar samples
+        """
+        return(tuple(x.item() if x.ndim==0 else x for x in (self.mean,self.std,self.min,self.max)))
+        
+def bus_id(instru):
+    """
+        Return an identifier of the bus used by the instrument : the GPIB interface 
+        for VISA GPIB resources, the resource name for the other VISA resources (the 
+        channels of a Bilt opened separately on 'ASRL4::INSTR' are on the same bus), 
+        otherwise the connection of the adapter (shared by the instruments of a Prologix). 
+        Return None if the instrument has no adapter.
+    """
+    adapter=getattr(instru,'adapter',None)
+    if adapter==None:
+        return None
+    connection=getattr(adapter,'connection',None)
+    if connection==None:
+        return(id(adapter))
+    resource_name=getattr(connection,'resource_name',None)
+    if isinstance(resource_name,str) and resource_name!='':
+        resource_name=resource_name.upper()
+        if resource_name.startswith('GPIB'):
+            return(resource_name.split('::')[0])
+        return(resource_name)
+    return(id(connection))
+        
 class Measurement(object):
     """ 
         Object handling the measurement process using a dictionary and returning a Panda Dataframe.
-        Each measurement is taken using a different thread.
+        The measurements are grouped by bus (see bus_id) : the groups are measured in 
+        different threads and the measurements of one group are taken one after the other.
+        After each measurement, group_time gives the duration of each group (labelled by its keys)
+        and critical_path the duration of the slowest group.
+        The properties of an instrument which can be read in one query are coalesced : 
+        the instrument defines coalesce(name), returning (group, item) or None, and 
+        read_coalesced(items), returning the values of the items with one query.
+        For example, x, y and theta of a SR830 are read with one SNAP? query.
+        The function reading each key (bound property getter or method with its arguments)
+        is compiled once when the object is created.
+        
+        OPTIONS :
+            - executor : ThreadPoolExecutor used for the measurements, shared with other
+              objects (it is not shut down by close). If None, the object creates its own executor.
+              Default : None
+            - timestamps : if True, the columns key+'_start' and key+'_end' with the 
+              time.monotonic() values at the start and the end of the read of each key 
+              are added after the measured columns. Default : False
+            - latency : dict {instrument:Latency_Histogram}, shared with other objects, 
+              where the duration of each read is added. Default : None
+            - average : number of reads averaged for each key. Default : 1
+            - setpoints : keys of the values of the steppers, to which the option average 
+              is not applied. Default : ()
+        A key can be cached with a time to live (in seconds) given as third element of its 
+        list : {'T':[ls,'temp1',{'ttl':2.0}]}. The first read is done with the measurement, 
+        then the cached value is returned and it is refreshed in the background (in the 
+        executor) when it is older than ttl. The value is not coalesced with other keys and 
+        its timestamps are the ones of the read of the cached value.
+        A key can be averaged over K reads with {'average':K} : the mean is given in the 
+        column key and the columns key+'_std', key+'_min' and key+'_max' are added, or with 
+        {'average':K,'raw':True} the K samples are given as a vector column. The keys on 
+        different buses are sampled concurrently. The averaged keys are not coalesced.
+        The option average of Measurement applies to all the keys without their own option, 
+        except the setpoints.
+        With {'pipeline':True}, the key is read after the move of the steppers when the 
+        measurement is used by a Measurement_Pipeline (latched or buffered quantities only).
+        If record is True and the format is 'line', the data are returned as NumPy 
+        structured records (see Row_Encoder) which are converted in Dataframe with to_dataframe.
     """
     
-    def __init__(self, measure_dict,format='line'):
-        N_measure=len(measure_dict)
-        self.executor=ThreadPoolExecutor(max_workers = N_measure)
+    def __init__(self, measure_dict,format='line',record=False,executor=None,timestamps=False,latency=None,average=1,setpoints=()):
         self.measure_dict=measure_dict
+        self.timestamps=timestamps
+        self.latency=latency
+        self.columns=list(measure_dict.keys())
+        # options given as third element of the lists of measure_dict
+        self.key_options=self.compile_options(measure_dict)
+        # averaged keys {key:(K,raw)}
+        self.average={}
+        for key in measure_dict.keys():
+            K=int(self.key_options[key].get('average',1 if key in setpoints else average))
+            if K>1:
+                self.average[key]=(K,bool(self.key_options[key].get('raw',False)))
+                if not(self.average[key][1]):
+                    self.columns+=[key+'_std',key+'_min',key+'_max']
+        # cached keys {key:ttl}, cache {key:(data,(start,end))} and keys being refreshed
+        self.ttl={key:float(options['ttl']) for key,options in self.key_options.items() 
+                  if options.get('ttl')!=None}
+        self.cache={}
+        self.refreshing=set()
+        self.cache_lock=Lock()
+        if timestamps:
+            for key in measure_dict.keys():
+                self.columns+=[key+'_start',key+'_end']
+        self.getters={key:self.compile_getter(measure_dict[key]) for key in measure_dict.keys()}
+        self.coalesced=self.coalesce(measure_dict)
+        self.groups=self.group_by_bus(measure_dict)
+        if executor==None:
+            self.executor=ThreadPoolExecutor(max_workers = max(len(self.groups)+len(self.ttl),1))
+            self.own_executor=True
+        else:
+            self.executor=executor
+            self.own_executor=False
         self.format=format
+        self.record=(record and format=='line')
+        self.encoder=Row_Encoder(self.columns)
+        self.group_time={}
+        self.critical_path=0.0
         
-    def measure(self,key):
-        this_measure=self.measure_dict[key]
-        # Take the measurement
+    def compile_options(self,measure_dict):
+        """
+            Return a dict {key:options} with the dict given as third element of the 
+            list of each key (empty dict if not provided)
+        """
+        key_options={}
+        for key in measure_dict.keys():
+            try:
+                options=measure_dict[key][2]
+            except (IndexError,TypeError):
+                options=None
+            key_options[key]=options if isinstance(options,dict) else {}
+        return(key_options)
+        
+    def coalesce(self,measure_dict):
+        """
+            Return a dict {key:(keys,items)} for the keys read with one query (coalesced 
+            with at least one other key) with keys and items the lists of the group
+        """
+        groups={}
+        for key in measure_dict.keys():
+            instru=measure_dict[key][0]
+            device=measure_dict[key][1]
+            if not(isinstance(device,str)) or not(hasattr(instru,'coalesce')) or key in self.ttl or key in self.average:
+                continue
+            try:
+                coalesce=instru.coalesce(device)
+            except:
+                coalesce=None
+            if coalesce!=None:
+                group,item=coalesce
+                groups.setdefault(group,([],[]))
+                groups[group][0].append(key)
+                groups[group][1].append(item)
+        coalesced={}
+        for keys,items in groups.values():
+            if len(keys)>1:
+                for key in keys:
+                    coalesced[key]=(keys,items)
+        return(coalesced)
+    
+    def group_by_bus(self,measure_dict):
+        """
+            Return the list of the groups of keys measured on the same bus.
+            The keys of instruments without adapter are measured alone, 
+            except the coalesced keys.
+        """
+        groups={}
+        for key in measure_dict.keys():
+            bus=bus_id(measure_dict[key][0])
+            if bus==None:
+                if key in self.coalesced:
+                    bus=('key',self.coalesced[key][0][0])
+                else:
+                    bus=('key',key)
+            groups.setdefault(bus,[]).append(key)
+        return(list(groups.values()))
+    
+    def measure_group(self,keys):
+        """
+            Take the measurements of a group one after the other, 
+            return (data, {key:(start,end)}, duration)
+        """
+        t0=time.time()
+        data={}
+        stamps={}
+        for key in keys:
+            if key in data:
+                continue
+            start=time.monotonic()
+            if key in self.ttl:
+                value,stamps[key]=self.cached(key)
+                data.update(value)
+                continue
+            if key in self.coalesced:
+                coalesced_keys,items=self.coalesced[key]
+                values=self.measure_dict[coalesced_keys[0]][0].read_coalesced(items)
+                data.update(zip(coalesced_keys,values))
+            else:
+                coalesced_keys=[key]
+                data.update(self.read(key))
+            end=time.monotonic()
+            for this_key in coalesced_keys:
+                stamps[this_key]=(start,end)
+            self.add_latency(key,end-start)
+        return((data,stamps,time.time()-t0))
+    
+    def add_latency(self,key,duration):
+        """
+            Add the duration of a read to the histogram of the instrument of key
+        """
+        if self.latency==None:
+            return
+        instru=self.measure_dict[key][0]
+        histogram=self.latency.get(instru)
+        if histogram==None:
+            histogram=self.latency.setdefault(instru,Latency_Histogram())
+        histogram.add(duration)
+    
+    def read(self,key):
+        """
+            Read key (K times if it is averaged) and return a dict with its columns
+        """
+        if not(key in self.average):
+            return({key:self.measure(key)})
+        K,raw=self.average[key]
+        if raw:
+            return({key:np.ravel([self.measure(key) for i in range(K)])})
+        statistics=Running_Statistics()
+        for i in range(K):
+            statistics.add(self.measure(key))
+        return(dict(zip((key,key+'_std',key+'_min',key+'_max'),statistics.result())))
+        
+    def cached(self,key):
+        """
+            Return (columns, (start,end)) of the cached value of key with the time of 
+            its read, read it if there is no value yet.
+            A refresh is started in the background if the value is older than its ttl.
+        """
+        with self.cache_lock:
+            entry=self.cache.get(key)
+            if entry!=None:
+                value,stamps=entry
+                if time.monotonic()-stamps[1]>self.ttl[key] and not(key in self.refreshing):
+                    self.refreshing.add(key)
+                    try:
+                        self.executor.submit(self.background_refresh,key)
+                    except RuntimeError:
+                        # executor shut down
+                        self.refreshing.discard(key)
+                return(entry)
+        return(self.refresh(key))
+    
+    def refresh(self,key):
+        """
+            Read key, store its columns in the cache with the time of the read and 
+            return (columns, (start,end))
+        """
+        start=time.monotonic()
+        value=self.read(key)
+        end=time.monotonic()
+        self.add_latency(key,end-start)
+        entry=(value,(start,end))
+        with self.cache_lock:
+            self.cache[key]=entry
+        return(entry)
+    
+    def background_refresh(self,key):
+        """
+            Refresh the cached value of key, the old value is kept in case of error
+        """
+        try:
+            self.refresh(key)
+        except Exception as error:
+            log.warning('Cannot refresh {} : {}'.format(key,error))
+        finally:
+            with self.cache_lock:
+                self.refreshing.discard(key)
+        
+    def compile_getter(self,this_measure):
+        """
+            Return a function without argument reading [instru,'attribute'] or [instru,('method',args)].
+            The getter of a property is bound to the instrument.
+        """
+        instru=this_measure[0]
         if isinstance(this_measure[1],str):
-            x=getattr(this_measure[0],this_measure[1])
+            attribute=getattr(type(instru),this_measure[1],None)
+            if isinstance(attribute,property) and attribute.fget!=None:
+                return(partial(attribute.fget,instru))
+            return(partial(getattr,instru,this_measure[1]))
         else:
-            x=getattr(this_measure[0],this_measure[1][0])(*this_measure[1][1])
-        return(x)
+            method=getattr(instru,this_measure[1][0])
+            return(partial(method,*this_measure[1][1]))
+        
+    def measure(self,key):
+        # Take the measurement
+        return(self.getters[key]())
     
     def format_data(self,data,format):
+        """
+            Format the data in a dataframe. Tabular data are converted as blocks of columns.
+        """
         if format=='line':
-            data_dict={}
-            for key in self.measure_dict.keys():
+            frames=[]
+            scalars={}
+            for key in self.columns:
                 this_data=data[key]
-                if isinstance(this_data,(float,int,str)):
-                    data_dict.update({key:[this_data]})
-                else:      
-                    N=len(this_data)
-                    keys=[key+'_'+str(i) for i in range(N)]
-                    data_dict.update(dict(zip(keys,list(this_data))))
-            return(pd.DataFrame(data=data_dict))
+                if np.ndim(this_data)==0:
+                    scalars[key]=[this_data]
+                    continue
+                if len(scalars)>0:
+                    frames.append(pd.DataFrame(scalars))
+                    scalars={}
+                this_data=np.ravel(np.asarray(this_data))
+                frames.append(pd.DataFrame(this_data.reshape(1,-1),columns=vector_columns(key,len(this_data))))
+            if len(scalars)>0:
+                frames.append(pd.DataFrame(scalars))
+            if len(frames)==1:
+                return(frames[0])
+            return(pd.concat(frames,axis=1))
         elif format=='line_multi':
-            data_list=[]
-            tuples=[]
-            for key in self.measure_dict.keys():
-                this_data=data[key]
-                if isinstance(this_data,(float,int,str)):
-                    data_list.append(this_data)
-                    tuples.append((key,0))
-                else:      
-                    N=len(this_data)
-                    data_list+=list(this_data)
-                    tuples+=[(key,i) for i in range(N)]
-            multi_index=pd.MultiIndex.from_tuples(tuples)
-            #return([multi_index,data_list])
-            return(pd.DataFrame(data_list,index=multi_index).transpose())
+            values=[np.ravel(np.asarray(data[key])) for key in self.columns]
+            if any(value.dtype.kind not in 'biuf' for value in values):
+                values=[value.astype(object) for value in values]
+            sizes=[len(value) for value in values]
+            multi_index=pd.MultiIndex.from_arrays([np.repeat(self.columns,sizes),
+                                                   np.concatenate([np.arange(N) for N in sizes])])
+            return(pd.DataFrame(np.concatenate(values).reshape(1,-1),columns=multi_index))
         elif format=='col':
-            return(pd.DataFrame(dict([ (k,pd.Series(v)) for k,v in data.items() ])))
+            N=max([np.size(v) for v in data.values()],default=0)
+            return(pd.DataFrame({k:pad(v,N) for k,v in data.items()}))
         elif format=='col_multi':
-            data_list=[]
-            for k,v in data.items():
-                if isinstance(v,(float,int,str)):
-                    data_list+=[(k,v)]
-                else:
-                    data_list+=[(k,pd.Series(v))]
-            try :
-                return(pd.DataFrame(dict(data_list)))
-            except :
-                return(pd.DataFrame.from_dict(dict(data_list),orient='index').transpose())
+            N=max([np.size(v) for v in data.values() if np.ndim(v)>0],default=1)
+            return(pd.DataFrame({k:np.full(N,v) if np.ndim(v)==0 else pad(v,N) for k,v in data.items()}))
         else:
             logging.error('Error in the format of the measurement')
             
-    def take(self):
-        future={}
+    def measure_keys(self,keys):
+        """
+            Measure the keys (the groups of the buses concurrently) and 
+            return (data, stamps), which can be given as preset to take
+        """
+        groups=[[key for key in group if key in keys] for group in self.groups]
+        futures=[self.executor.submit(self.measure_group,group) for group in groups if len(group)>0]
         data={}
-        for key in self.measure_dict.keys():
-            future[key] = self.executor.submit(self.measure,key)
-        for key in self.measure_dict.keys():
-            data[key]=future[key].result()
-        #return(data)    
+        stamps={}
+        for future in futures:
+            group_data,group_stamps,duration=future.result()
+            data.update(group_data)
+            stamps.update(group_stamps)
+        return((data,stamps))
+            
+    def take(self,preset=None):
+        """
+            Take the measurements and return the formatted data.
+            preset is the (data, stamps) returned by measure_group for keys already read.
+        """
+        results,stamps,groups=self.start_take(preset)
+        future=[self.executor.submit(self.measure_group,keys) for keys in groups]
+        return(self.end_take(results,stamps,groups,[this_future.result() for this_future in future]))
+    
+    def start_take(self,preset=None):
+        """
+            Return (data, stamps, groups) with the data and stamps of preset and 
+            the groups of keys to measure
+        """
+        results={}
+        stamps={}
+        if preset!=None:
+            results.update(preset[0])
+            stamps.update(preset[1])
+        groups=[]
+        for keys in self.groups:
+            keys=[key for key in keys if not(key in results)]
+            if len(keys)>0:
+                groups.append(keys)
+        return((results,stamps,groups))
+    
+    def end_take(self,results,stamps,groups,outputs):
+        """
+            Merge the outputs of measure_group for the groups and return the formatted data
+        """
+        group_time={}
+        for keys,(group_data,group_stamps,duration) in zip(groups,outputs):
+            results.update(group_data)
+            stamps.update(group_stamps)
+            group_time['+'.join(keys)]=duration
+        self.group_time=group_time
+        self.critical_path=max(group_time.values(),default=0.0)
+        data={key:results[key] for key in self.columns if key in results}
+        if self.timestamps:
+            for key in self.measure_dict.keys():
+                data[key+'_start'],data[key+'_end']=stamps[key]
+        #return(data)
+        if self.record:
+            return(self.encoder.encode(data))
         return(self.format_data(data,self.format))
+    
+    def to_dataframe(self,data):
+        """
+            Convert the data returned by take (Dataframe or structured record) in a Dataframe
+        """
+        if isinstance(data,np.ndarray):
+            return(records_to_dataframe(data))
+        else:
+            return(data)
         
     def close(self):
-        self.executor.shutdown()
+        if self.own_executor:
+            self.executor.shutdown()
+            
+class Measurement_Pipeline(object):
+    """
+        Take the measurements of a Measurement in a background thread, so that the readout 
+        of a point overlaps the move of the steppers to the next point and the wait time.
+        Only the keys with the option {'pipeline':True} are deferred : they should be latched 
+        or buffered by the instrument at the point (triggered acquisitions, buffers), so that 
+        their value does not change when the steppers move. The other keys and the setpoints 
+        are read before submit returns, i.e. before the move.
+        The points are read and put in the queue in order. At most depth readouts are 
+        pending, submit waits for the oldest one otherwise. If a deferred key is on the bus 
+        of a key read before the move, submit waits for the pending readouts before reading.
+        
+        EXAMPLES :
+            measure={'Vgate':[dac,'dac1'],'X':[lockin,'buffer_x',{'pipeline':True}]}
+            pipeline=Measurement_Pipeline(Measurement(measure),setpoints=['Vgate'])
+            pipeline.submit(data_saver)     # returns once Vgate is read
+            pipeline.close()                # wait for the pending readouts
+    """
+    
+    def __init__(self,measurement,setpoints=[],depth=1):
+        self.measurement=measurement
+        self.setpoints=[key for key in setpoints if key in measurement.measure_dict]
+        self.deferred=[key for key in measurement.measure_dict.keys() if 
+                       measurement.key_options[key].get('pipeline',False) and not(key in self.setpoints)]
+        self.immediate=[key for key in measurement.measure_dict.keys() if not(key in self.deferred)]
+        # True if a deferred key shares its bus with a key read before the move
+        self.shared_bus=any(any(key in self.deferred for key in keys) and 
+                            any(key in self.immediate for key in keys) for keys in measurement.groups)
+        self.depth=depth
+        self.worker=ThreadPoolExecutor(max_workers=1)
+        self.pending=[]
+        
+    def submit(self,q,checkpoint=None):
+        """
+            Read the keys which are not deferred, then take the deferred measurements in 
+            the background and put the data in q (with the checkpoint if provided)
+        """
+        limit=0 if self.shared_bus else self.depth-1
+        while len(self.pending)>limit:
+            self.wait(self.pending.pop(0))
+        preset=self.measurement.measure_keys(self.immediate)
+        self.pending.append(self.worker.submit(self.readout,q,preset,checkpoint))
+        
+    def readout(self,q,preset,checkpoint):
+        df=self.measurement.take(preset=preset)
+        if checkpoint==None:
+            q.put(df)
+        else:
+            q.put((df,checkpoint))
+    
+    def wait(self,future):
+        try:
+            future.result()
+        except Exception as error:
+            log.error('Error in the readout of a point : {}'.format(error))
+            
+    def close(self):
+        """
+            Wait for the pending readouts and stop the thread
+        """
+        while len(self.pending)>0:
+            self.wait(self.pending.pop(0))
+        self.worker.shutdown()
@@ -6,8 +6,12 @@ import pandas as pd
 import numpy as np
 # import datashader as ds
 import sys,os,time
-import gzip,bz2,lzma
+import gzip,bz2,lzma,zlib,io
 import pyperclip
+try:
+    import h5py
+except ImportError:
+    h5py=None
 
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QFileDialog, QMainWindow, QDockWidget, QAction, qApp, QTextEdit
@@ -18,6 +22,65 @@ from matplotlib.figure import Figure
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from threading import Thread, Event, Lock
 
+def is_hdf_file(file):
+    """
+        Return True if the file is a hdf file
+    """
+    if h5py==None:
+        return False
+    try:
+        return(h5py.is_hdf5(file))
+    except:
+        return False
+
+class Stream_Reader(object):
+    """
+        Read a text data file, compressed or not, while it is written.
+        Each call of read() returns only the complete lines written since the last call,
+        an incomplete last line is kept until it is finished.
+    """
+    def __init__(self,file):
+        self.file=file
+        self.extension=file.split('.')[-1]
+        # position in the raw file
+        self.offset=0
+        # incomplete last line
+        self.remainder=b''
+        self.decompressor=self.new_decompressor()
+        
+    def new_decompressor(self):
+        if self.extension=='gz':
+            return(zlib.decompressobj(wbits=31))
+        elif self.extension=='bz2':
+            return(bz2.BZ2Decompressor())
+        elif self.extension=='xz':
+            return(lzma.LZMADecompressor())
+        else:
+            return(None)
+    
+    def decompress(self,raw):
+        if self.decompressor==None:
+            return(raw)
+        output=[]
+        while len(raw)>0:
+            output.append(self.decompressor.decompress(raw))
+            if self.decompressor.eof:
+                raw=self.decompressor.unused_data
+                self.decompressor=self.new_decompressor()
+            else:
+                raw=b''
+        return(b''.join(output))
+        
+    def read(self):
+        with open(self.file,'rb') as f:
+            f.seek(self.offset)
+            raw=f.read()
+        self.offset+=len(raw)
+        data=self.remainder+self.decompress(raw)
+        index=data.rfind(b'\n')+1
+        self.remainder=data[index:]
+        return(data[:index].decode())
+
 class myMainWindow(QMainWindow):
     """
         class to handle the close button in QT5 for the main window
@@ -128,6 +191,8 @@ class PlotterQT(object):
         self.lock.acquire()
         self._file=file
         self._first_load=True
+        # hdf or text file
+        self._hdf=is_hdf_file(file)
         # Count the length of the header
         header=self.header_count()
         self._header_count=header[0]
@@ -144,6 +209,11 @@ class PlotterQT(object):
         """
             Count the header length and return (header_length, header_str)
         """
+        # handle hdf files
+        if self._hdf:
+            with h5py.File(self._file,'r',libver='latest',swmr=True) as f:
+                header=f.attrs.get('header','')
+            return((0,header))
         # handle compressed files
         file_handler={'gz':gzip.open,'bz2':bz2.open,'xz':lzma.open}
         extension=self._file.split('.')[-1]
@@ -204,6 +274,39 @@ class PlotterQT(object):
                     pass
         return(plot_range)
        
+    def read_file(self,columns=None,skiprows=None):
+        """
+            read the data of the file (csv, compressed csv or hdf).
+            For a text file, the whole file is read if columns is None, otherwise only the 
+            lines written since the last read are parsed.
+            For a hdf file, the first skiprows rows are skipped.
+        """
+        if self._hdf:
+            with h5py.File(self._file,'r',libver='latest',swmr=True) as f:
+                names=list(f.attrs['columns'])
+                for name in names:
+                    f[name].refresh()
+                N=min([f[name].shape[0] for name in names])
+                start=0 if skiprows==None else min(skiprows,N)
+                frames=[]
+                for name in names:
+                    # 2D datasets (tabular data) are given as the columns name_i
+                    if f[name].ndim==2:
+                        labels=[name+'_'+str(i) for i in range(f[name].shape[1])]
+                        frames.append(pd.DataFrame(f[name][start:N],columns=labels))
+                    else:
+                        frames.append(pd.DataFrame({name:f[name][start:N]}))
+                data=pd.concat(frames,axis=1)
+            return(data)
+        elif columns is None:
+            self._reader=Stream_Reader(self._file)
+            return(pd.read_csv(io.StringIO(self._reader.read()),comment='#',header=0))
+        else:
+            text=self._reader.read()
+            if text=='':
+                return(pd.DataFrame(columns=columns))
+            return(pd.read_csv(io.StringIO(text),comment='#',header=None,names=columns))
+       
     def load_data(self):
         """
             load new data from file into self._data and update graph accordingly
@@ -211,7 +314,7 @@ class PlotterQT(object):
         if self._first_load:   
             try:
                 #self.data=pd.read_csv(self._file,comment='#',header=0).fillna(0)
-                self.data=pd.read_csv(self._file,comment='#',header=0)
+                self.data=self.read_file()
                 self.data=self.data.apply(pd.to_numeric,errors='coerce')
                 self.data.insert(0,'Index',list(range(len(self.data))))
                 self._first_load=False
@@ -225,10 +328,11 @@ class PlotterQT(object):
         else:
             Ndata=len(self.data)
             data_columns=self.data.columns[1:]
-            skiprows = Ndata + self._header_count
+            # only used for hdf files, text files are read from the last position
+            skiprows = Ndata
             try:
                 #data=pd.read_csv(self._file,comment='#',header=0,names=data_columns, skiprows=skiprows).fillna(0)
-                data=pd.read_csv(self._file,comment='#',header=0,names=data_columns, skiprows=skiprows)
+                data=self.read_file(data_columns,skiprows)
                 data=data.apply(pd.to_numeric,errors='coerce')
                 if len(data)>0:
                     data.insert(0,'Index',list(range(Ndata,Ndata+len(data))))
@@ -507,7 +611,8 @@ class mainwindow(myMainWindow):
         fname = file_dialog.getOpenFileName(None, "Select data file...", dir, filter="All files (*);; SM Files (*.sm)")
         file=fname[0]
         try:
-            test_import=pd.read_csv(file,comment='#',header=0)
+            if not(is_hdf_file(file)):
+                test_import=pd.read_csv(file,comment='#',header=0)
             valid=True
         except:
             valid=False
@@ -524,7 +629,8 @@ class mainwindow(myMainWindow):
     def paste_file(self):
         file=pyperclip.paste()
         try:
-            test_import=pd.read_csv(file,comment='#',header=0)
+            if not(is_hdf_file(file)):
+                test_import=pd.read_csv(file,comment='#',header=0)
             valid=True
         except:
             valid=False
@@ -32,6 +32,7 @@ import os,io
 import gzip,bz2,lzma
 from matplotlib.figure import Figure
 from pymeso.utils import ExperimentError
+from pymeso.utils.data_file import read_data_file,read_header
 from IPython.display import display,Markdown,Image
         
 class Plotter_in_Notebook(object):
@@ -62,7 +63,7 @@ class Plotter_in_Notebook(object):
         try:
             self._file=os.path.abspath(file)
             self._filename=os.path.basename(self._file)
-            data=pd.read_csv(self._file,comment='#')
+            data=read_data_file(self._file)
             data.insert(0,'Index',list(range(len(data))))
             columns_list=list(data.columns)
         except:
@@ -100,31 +101,7 @@ class Plotter_in_Notebook(object):
         """
             Count the header length and return (header_length, header_str)
         """
-        # handle compressed files
-        file_handler={'gz':gzip.open,'bz2':bz2.open,'xz':lzma.open}
-        extension=self._file.split('.')[-1]
-        if extension in ('gz','bz2','xz'):
-            file_open=file_handler[extension]
-            mode_open='rt'
-        else:
-            file_open=open
-            mode_open='r'
-        
-        comment='#'
-        header = ""
-        header_read = False
-        header_count = 0
-        
-        with file_open(self._file, mode_open) as f:
-        #with open(self._file, 'r') as f:
-            while not header_read:
-                line = f.readline()
-                if line.startswith(comment):
-                    header += line.strip() + '\n'
-                    header_count += 1
-                else:
-                    header_read = True
-        return((header_count,header))
+        return(read_header(self._file))
         
     def header_analyse(self,header):
         """
@@ -161,7 +138,7 @@ class Plotter_in_Notebook(object):
         return(plot_range)
     
     def plot_fig(self):
-        data=pd.read_csv(self._file,comment='#',header=0)
+        data=read_data_file(self._file)
         data.insert(0,'Index',list(range(len(data))))
         fig = Figure(dpi=150)
         if self.zdata.value[0] == "None": # case of regular figure
@@ -186,11 +186,11 @@ class Spy(object):
         Object launching a spy process with a QT interface
     """
     
-    def __init__(self, measure_dict):
+    def __init__(self, measure_dict, executor=None):
         self.set_measure_dict(measure_dict)
         self.meas_object_dict={}
         for group in self.measure_dict.keys():
-            self.meas_object_dict[group]=Measurement(self.measure_dict[group],format='col')
+            self.meas_object_dict[group]=Measurement(self.measure_dict[group],format='col',executor=executor)
         self.start_logger()
                 
     def set_measure_dict(self,measure_dict):
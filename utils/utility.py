@@ -26,14 +26,22 @@ import logging
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
-import time, subprocess, platform
+import time, subprocess, platform, os, json, tempfile, pickle
+import gzip,bz2,lzma
 import numpy as np
 import pandas as pd
 from PyQt5 import QtWidgets
 import re
-from queue import Queue
-from threading import Thread, Event
+from queue import Queue,Empty,Full
+from threading import Thread, Event, Lock, Condition
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
+from .measure import records_to_dataframe,vector_columns
+
+try:
+    import h5py
+except ImportError:
+    h5py=None
 
 
 def message_box(message):
@@ -146,6 +154,16 @@ class myTimer(object):
 class Sweep(object):
     """
         Sweep object to do a sweep of instru.device in a different thread
+        
+        Three cases are handled, depending on the methods of the instrument :
+            - sweepable instrument (device+'_sweepable' is True) : the instrument does the 
+              sweep and reports its progress (device+'_sweep', '_value', '_progress', '_pause', '_stop').
+            - instrument with a hardware ramp (device+'_ramp') : device+'_ramp'(start,stop,rate) 
+              uploads a ramp program, starts it and returns its duration in s, or None if the 
+              instrument can not do this ramp. device+'_ramp_stop'() aborts the program. 
+              A pause aborts the program, which is uploaded again from the current value 
+              when the sweep is resumed. At the end the device is set to the final value.
+            - otherwise the values are set by software every timestep.
     """
     def __init__(self,name,instru,device):
         self.name=name
@@ -155,14 +173,26 @@ class Sweep(object):
             self._sweepable=getattr(self.instru, self.device+'_sweepable')
         except:
             self._sweepable=False
+        self._rampable=hasattr(self.instru, self.device+'_ramp')
         # define the timestep in ms
         self.timestep=50
+        # sweeps shorter than this duration (in s) report a low rate at the debug level only
+        self.min_report_duration=1.0
         # define the Event used for pause and stop
         self.should_stop=Event()
         self.should_pause=Event()
+        # define the Event set when no sweep is running
+        self.done=Event()
+        self.done.set()
+        # worker thread doing the sweeps, created by sweep and stopped by close
+        self.executor=None
         
         self.value=self.get_value()
         self.progress=0
+        # rates of the last sweep (see report_rate)
+        self.requested_rate=None
+        self.achieved_rate=None
+        self.merged_points=0
     
     def generate_list(self,start,stop,rate,mode='linear'):
         """
@@ -196,7 +226,20 @@ class Sweep(object):
             method used to do the sweep in a different thread
             The point of the sweep are provided through the args
         """
-        time_sleep=self.timestep/1000
+        try:
+            self.run_sweep(start,stop,rate)
+        finally:
+            self.done.set()
+    
+    def run_sweep(self,start,stop,rate):
+        """
+            Do the sweep, the waits are interrupted by a stop
+        """
+        # nothing to sweep : no write and no rate to report
+        if start==stop:
+            self.value=stop
+            self.progress=1.0
+            return
         # case of a self sweepable instrument
         if self._sweepable:
             device_value=self.device+'_value'
@@ -209,36 +252,125 @@ class Sweep(object):
                     break
                 self.value=getattr(self.instru,device_value)
                 self.progress=getattr(self.instru,device_progress)
-                time.sleep(0.1)
+                self.should_stop.wait(0.1)
+        # case of an instrument with a hardware ramp
+        elif self._rampable and self.hardware_ramp(start,stop,rate):
+            pass
         # case of a non sweepable instrument
-        else:                           
-            list_sweep=self.generate_list(start, stop, rate)
-            N_points=max(len(list_sweep)-1,1)        
-            i=0
-            for x in list_sweep:
+        else:
+            self.software_sweep(start,stop,rate)
+            
+    def hardware_ramp(self,start,stop,rate):
+        """
+            Ramp from start to stop with the ramp program of the instrument.
+            Return False if the instrument can not do the ramp (nothing has been done).
+            The progress is estimated from the time, the instrument is not read during the ramp.
+        """
+        time_sleep=self.timestep/1000
+        ramp=getattr(self.instru,self.device+'_ramp')
+        duration=ramp(start,stop,rate)
+        if duration is None:
+            return(False)
+        origin=start
+        t_start=time.monotonic()
+        paused=0.0
+        while True:
+            t0=time.monotonic()
+            while not(self.should_pause.is_set()):
+                elapsed=time.monotonic()-t0
+                if elapsed>=duration:
+                    break
+                fraction=elapsed/duration if duration>0 else 1.0
+                self.value=origin+(stop-origin)*fraction
+                self.progress=(self.value-start)/(stop-start) if stop!=start else 1.0
+                if self.should_stop.wait(min(time_sleep,duration-elapsed)):
+                    getattr(self.instru,self.device+'_ramp_stop')()
+                    return(True)
+            if not(self.should_pause.is_set()):
+                break
+            # pause : abort the program and restart it from the current value
+            getattr(self.instru,self.device+'_ramp_stop')()
+            t_pause=time.monotonic()
+            while self.should_pause.is_set():
+                if self.should_stop.wait(time_sleep):
+                    return(True)
+            paused+=time.monotonic()-t_pause
+            origin=getattr(self.instru,self.device)
+            duration=ramp(origin,stop,rate)
+            if duration is None:
+                self.software_sweep(origin,stop,rate)
+                return(True)
+        setattr(self.instru,self.device,stop)
+        self.value=stop
+        self.progress=1.0
+        self.report_rate(start,rate,time.monotonic()-t_start-paused)
+        return(True)
+        
+    def software_sweep(self,start,stop,rate):
+        """
+            Sweep by setting the values on a schedule : the point k is due at the time 
+            k*timestep after the start (monotonic clock, pauses excluded) with the value 
+            of the ramp at this time. When the writes are late, the points already due 
+            are merged in a single write of the last one, so that the duration of the 
+            sweep does not depend on the latency of the bus.
+        """
+        time_sleep=self.timestep/1000
+        duration=abs((stop-start)/rate)
+        N_points=max(int(np.ceil(duration/time_sleep)),1)
+        merged=0
+        k=0
+        t0=time.monotonic()
+        while True:
+            if self.should_pause.is_set():
+                t_pause=time.monotonic()
                 while self.should_pause.is_set():
-                    if self.should_stop.is_set():
+                    if self.should_stop.wait(time_sleep):
                         break
-                    time.sleep(time_sleep)
-                if self.should_stop.is_set():
-                    break
-                setattr(self.instru,self.device,x)
-                self.value=x
-                self.progress=i/N_points
-                i+=1
-                time.sleep(time_sleep)
+                t0+=time.monotonic()-t_pause
+            if self.should_stop.is_set():
+                break
+            fraction=min(k*time_sleep/duration,1.0) if duration>0 else 1.0
+            x=start+(stop-start)*fraction
+            setattr(self.instru,self.device,x)
+            self.value=x
+            self.progress=fraction
+            if k==N_points:
+                break
+            # next point : the last one already due, or the following one
+            due=min(int((time.monotonic()-t0)/time_sleep),N_points)
+            next_k=max(k+1,due)
+            merged+=next_k-k-1
+            k=next_k
+            self.should_stop.wait(max(t0+min(k*time_sleep,duration)-time.monotonic(),0.0))
+        self.report_rate(start,rate,time.monotonic()-t0,merged)
+        
+    def report_rate(self,start,rate,elapsed,merged=0):
+        """
+            Store the requested and achieved rates of the last sweep (achieved_rate, requested_rate, 
+            merged_points) and log them when the sweep was more than 10% slower than requested 
+            (at the info level if it lasted at least min_report_duration, otherwise at the debug level)
+        """
+        self.requested_rate=abs(rate)
+        self.achieved_rate=abs(self.value-start)/elapsed if elapsed>0 else self.requested_rate
+        self.merged_points=merged
+        if self.achieved_rate<0.9*self.requested_rate:
+            level=logging.INFO if elapsed>=self.min_report_duration else logging.DEBUG
+            log.log(level,'Sweep {} : achieved rate {:g} for a requested rate {:g} ({} points merged)'.format(
+                self.name,self.achieved_rate,self.requested_rate,merged))
     
     def sweep(self,start,stop,rate):
         """
-            start a sweep in a thread from start to stop at a given rate
-            return the link to the thread
+            start a sweep in the worker thread from start to stop at a given rate
+            return the future of the sweep
         """       
         self.should_pause.clear()
         self.should_stop.clear()
-        args=(start,stop,rate)
-        thread_work_sweep = Thread(name='Sweeper_thread',target=self.work_sweep,args=args)                         
-        thread_work_sweep.start()          
-        return(thread_work_sweep)
+        self.done.clear()
+        if self.executor==None:
+            self.executor=ThreadPoolExecutor(max_workers=1,thread_name_prefix='Sweeper_thread')
+        future=self.executor.submit(self.work_sweep,start,stop,rate)
+        future.add_done_callback(log_exception)
+        return(future)
     
     def pause(self,state):
         """
@@ -261,6 +393,14 @@ class Sweep(object):
                 getattr(self.instru,self.device+'_stop')()
         self.should_stop.set()
         
+    def close(self):
+        """
+            Stop the worker thread once the current sweep is done, a new one is started by the next sweep
+        """
+        if self.executor!=None:
+            self.executor.shutdown(wait=True)
+            self.executor=None
+        
     def get_value(self):
         """"
             Return the current value of the sweep by reading the instrument
@@ -270,21 +410,278 @@ class Sweep(object):
         else:        
             return(getattr(self.instru,self.device))
 
+class Data_Buffer(object):
+    """
+        In-memory column store of the acquired data shared by Data_Saver and the 
+        plotters. The columns are numpy arrays preallocated with 'size' rows and 
+        doubled when full, so that reading the data does not require to parse 
+        the file. Numerical columns are stored as float, the others as object.
+        
+        OPTIONS :
+            - size : number of rows initially allocated. Default : 1000
+            - maxlen : if not None, only the last maxlen rows are kept (ring buffer). Default : None
+            
+        EXAMPLES :
+            buffer=Data_Buffer(size=500*500)
+            buffer.append(df)
+            df=buffer.to_dataframe()
+            x=buffer.column('Vbias')
+    """
+    def __init__(self,size=1000,maxlen=None):
+        self.maxlen=maxlen
+        if maxlen!=None:
+            # twice maxlen to move the data only once every maxlen rows
+            self.size=2*maxlen
+        else:
+            self.size=max(int(size),1)
+        self._columns={}
+        # index of the first and after the last valid rows
+        self._start=0
+        self._stop=0
+        self.lock=Lock()
+        
+    def __len__(self):
+        return(self._stop-self._start)
+    
+    @property
+    def columns(self):
+        """
+            List of the column names
+        """
+        return(list(self._columns.keys()))
+    
+    def new_column(self,dtype):
+        """
+            Internal function :
+            Return an empty column of the current size
+        """
+        if dtype==object:
+            return(np.full(self.size,None,dtype=object))
+        return(np.full(self.size,np.nan))
+        
+    def reserve(self,N):
+        """
+            Internal function :
+            Make room for N new rows, by growing the columns or, for a ring buffer, 
+            by moving the last rows at the beginning of the columns
+        """
+        if self.maxlen!=None:
+            N=min(N,self.maxlen)
+            if self._stop+N>self.size:
+                keep=max(self.maxlen-N,0)
+                first=max(self._stop-keep,self._start)
+                for name,column in self._columns.items():
+                    column[:self._stop-first]=column[first:self._stop]
+                self._stop-=first
+                self._start=0
+            return(N)
+        if self._stop+N>self.size:
+            size=self.size
+            while self._stop+N>size:
+                size*=2
+            for name,column in self._columns.items():
+                new=np.full(size,None,dtype=object) if column.dtype==object else np.full(size,np.nan)
+                new[:self._stop]=column[:self._stop]
+                self._columns[name]=new
+            self.size=size
+        return(N)
+        
+    def append(self,df):
+        """
+            Append the rows of a dataframe to the buffer
+        """
+        with self.lock:
+            N=self.reserve(len(df))
+            if N==0:
+                return
+            for name in df.columns:
+                values=df[name].to_numpy()[-N:]
+                if not(name in self._columns):
+                    dtype=float if values.dtype.kind in 'biuf' else object
+                    self._columns[name]=self.new_column(dtype)
+                column=self._columns[name]
+                if column.dtype!=object and values.dtype.kind not in 'biuf':
+                    column=column.astype(object)
+                    self._columns[name]=column
+                column[self._stop:self._stop+N]=values
+            self._stop+=N
+            if self.maxlen!=None and len(self)>self.maxlen:
+                self._start=self._stop-self.maxlen
+            
+    def column(self,name):
+        """
+            Return a copy of the column 'name'
+        """
+        with self.lock:
+            return(self._columns[name][self._start:self._stop].copy())
+            
+    def to_dataframe(self):
+        """
+            Return a dataframe with a copy of the data
+        """
+        with self.lock:
+            data={name:column[self._start:self._stop].copy() for name,column in self._columns.items()}
+        return(pd.DataFrame(data))
+        
+class Writer_Service(object):
+    """
+        Process-wide service writing the files of several Data_Saver (option shared=True)
+        with a single thread. The savers are served in turn, each one writing at most 
+        buffer_size rows at each turn. The thread is started when a saver is registered
+        and ends when all the savers are closed.
+        
+        EXAMPLES :
+            service=Writer_Service.get()
+            service.savers     # list of the savers currently served
+    """
+    instance=None
+    
+    @classmethod
+    def get(cls):
+        """
+            Return the service of the process
+        """
+        if cls.instance==None:
+            cls.instance=Writer_Service()
+        return(cls.instance)
+    
+    def __init__(self,idle_time=0.1):
+        self.savers=[]
+        self.idle_time=idle_time
+        self.condition=Condition()
+        self.thread=None
+        
+    def register(self,saver):
+        """
+            Add a saver to the service and start the thread if needed
+        """
+        with self.condition:
+            self.savers.append(saver)
+            if self.thread==None:
+                self.thread=Thread(name='Writer_Service',target=self.work)
+                self.thread.start()
+            self.condition.notify()
+                
+    def notify(self):
+        """
+            Wake up the thread when new data are available
+        """
+        with self.condition:
+            self.condition.notify()
+            
+    def work(self):
+        """
+            Internal function :
+            Serve the savers in turn until all of them are finished
+        """
+        while True:
+            with self.condition:
+                self.savers=[saver for saver in self.savers if not(saver.done.is_set())]
+                if len(self.savers)==0:
+                    self.thread=None
+                    return
+                savers=list(self.savers)
+            written=False
+            for saver in savers:
+                if saver.service_step():
+                    written=True
+            if not(written):
+                with self.condition:
+                    self.condition.wait(self.idle_time)
+
 class Data_Saver(object):
     """
         Create queues and thread to save data in a file.
         The options format determines the file format : csv or hdf (format='hdf').
+        In the csv format, the header and the data are written through a single stream
+        opened for the whole measurement. If the file extension is .gz, .bz2 or .xz, the stream 
+        is compressed with the corresponding algorithm. The stream is flushed after each block 
+        of data, which makes the data readable during the measurement for .gz files 
+        (for .bz2 and .xz files, the data are readable when the file is closed).
+        In the hdf format, each column is saved as an extendable typed dataset
+        (chunks of chunk_size points) and the header is saved as the attribute 'header'.
+        
+        OPTIONS :
+            - buffered : if True, the data available in the queue are grouped and written in one block 
+              when buffer_size rows are received or after flush_time (in s). Default : False
+            - buffer_size : number of rows written in one block in buffered mode. Default : 1000
+            - flush_time : maximum time (in s) before writing the data in buffered mode. Default : 1.0
+            - data_buffer : if not None, Data_Buffer where the data are also stored. Default : None
+            - journal : if not None, dict saved in the journal file file+'.journal' together with 
+              the checkpoint of the last written data (see put) and the position in the file
+              (size in bytes for csv, number of rows for hdf). Used by Experiment.resume. Default : None
+            - fsync_every : the file is synchronized on the disk (fsync) every fsync_every blocks of data.
+              When fsync is used, the journal is only updated after a synchronization. Default : 0 (never)
+            - maxsize : maximum number of data waiting in the queue, 0 for no limit. Default : 0
+            - policy : behaviour of put when the queue is full. Default : 'block'
+                * 'block' : wait for a free place in the queue (the stepper is slowed down)
+                * 'spill' : the data are written in a temporary file in spill_dir and saved later
+                * 'drop' : the data are lost and counted in dropped
+            - spill_dir : directory of the temporary file of the 'spill' policy, if None 
+              the temporary directory of the system. Default : None
+            - shared : if True, the file is written by the thread of the Writer_Service shared 
+              by all the savers of the process instead of a dedicated thread. Default : False
+              
+        The state of the saver is given by metrics() : number of data waiting (queue_depth),
+        duration of the last write (write_latency in s), bytes_written, rows_written, 
+        dropped (policy 'drop', or data put after an error closed the file) and spilled data.
     """
-    def __init__(self,file,file_format='csv',append=False):
+    def __init__(self,file,file_format='csv',append=False,header=None,chunk_size=1024,
+                 buffered=False,buffer_size=1000,flush_time=1.0,data_buffer=None,
+                 journal=None,fsync_every=0,maxsize=0,policy='block',spill_dir=None,shared=False):
         # Should append in existing file
         self.append=append
         # File where to save the data
         self.file=file
+        # Header written at the beginning of the file (if append is False)
+        self.header=header
+        # Size of the chunks used for the hdf file
+        self.chunk_size=chunk_size
+        # Options of the buffered mode
+        self.buffered=buffered
+        self.buffer_size=buffer_size
+        self.flush_time=flush_time
+        # In-memory copy of the data
+        self.data_buffer=data_buffer
+        # Journal of the written data
+        self.journal=journal
+        self.journal_file=file+'.journal'
+        self.fsync_every=fsync_every
+        self.checkpoint=None
+        self.Nblocks=0
+        # Policy when the queue is full
+        if not(policy in ('block','spill','drop')):
+            raise ExperimentError('The policy should be block, spill or drop.')
+        self.policy=policy
+        self.spill_dir=spill_dir
+        self.spill_file=None
+        self.spill_position=0
+        self.spill_pending=0
+        self.lock=Lock()
+        # Metrics
+        self.write_latency=0.0
+        self.bytes_written=0
+        self.rows_written=0
+        self.dropped=0
+        self.spilled=0
         # Instantiate the queue q used for the multithreading
-        self.q=Queue(maxsize=0)
-        # Start the thread to save the data to the file temp_file
-        self.save_data_thread = Thread(name='Data_Saver',target=self.save_data,args=(self.file,self.q,file_format))
-        self.save_data_thread.start()
+        self.q=Queue(maxsize=maxsize)
+        self.file_format=file_format
+        # Event set when the file is closed
+        self.done=Event()
+        if shared:
+            # The data are saved by the Writer_Service
+            self.service=Writer_Service.get()
+            self.service_file=None
+            self.pending=[]
+            self.pending_rows=0
+            self.pending_time=0
+            self.service.register(self)
+        else:
+            # Start the thread to save the data to the file temp_file
+            self.service=None
+            self.save_data_thread = Thread(name='Data_Saver',target=self.save_data,args=(self.file,self.q,file_format))
+            self.save_data_thread.start()
         
     def save_data(self,file,q,file_format):
         """
@@ -293,30 +690,565 @@ class Data_Saver(object):
             Write the header if it is the first save
             If 'stop' is received then stop
         """
-        if self.append:
-            first_save=False
+        try:
+            with self.open_writer() as f:
+                stop=False
+                while not(stop):
+                    block,stop=self.get_block(q)
+                    if not(self.write_block(f,block,stop)):
+                        break
+        finally:
+            self.done.set()
+    
+    def service_step(self):
+        """
+            Internal function :
+            Used by the Writer_Service. Take the available data from the queue (at most 
+            buffer_size rows) and write them if the block is ready (always if not buffered).
+            Return True if data have been written.
+        """
+        if self.done.is_set():
+            return False
+        stop=False
+        try:
+            if self.service_file==None:
+                self.service_file=self.open_writer()
+            while self.pending_rows<self.buffer_size:
+                try:
+                    df=self.get_item(self.q,timeout=0)
+                except Empty:
+                    break
+                if isinstance(df,tuple):
+                    df,self.checkpoint=df
+                if not(isinstance(df,(pd.DataFrame,np.ndarray))):
+                    stop=True
+                    break
+                if len(self.pending)==0:
+                    self.pending_time=time.time()
+                self.pending.append(df)
+                self.pending_rows+=len(df)
+            ready=(stop or self.pending_rows>=self.buffer_size or (len(self.pending)>0 and 
+                    (not(self.buffered) or time.time()-self.pending_time>=self.flush_time)))
+            if not(ready):
+                return False
+            block=self.pending
+            self.pending=[]
+            self.pending_rows=0
+            if not(self.write_block(self.service_file,block,stop)):
+                stop=True
+        except:
+            log.error('Error in writing data to {}'.format(self.file))
+            stop=True
+        if stop:
+            try:
+                self.service_file.close()
+            except:
+                pass
+            self.done.set()
+        return True
+    
+    def is_running(self):
+        """
+            Return True until the file is closed
+        """
+        return(not(self.done.is_set()))
+        
+    def open_writer(self):
+        """
+            Internal function :
+            Open the file and write the header if append is False.
+            The hdf file is kept open and is readable during the measurement (SWMR mode).
+        """
+        if self.file_format=='hdf':
+            if self.append:
+                mode='a'
+            else:
+                mode='w'
+            f=h5py.File(self.file,mode,libver='latest')
+            if not(self.append) and self.header!=None:
+                f.attrs['header']=self.header
         else:
-            first_save=True
-        # Ndata=0
-        while True:
-            df=q.get()
+            f=self.open_file(self.file,append=self.append)
+            if not(self.append) and self.header!=None:
+                f.write(self.header.replace('\n',os.linesep).encode())
+                f.flush()
+        self.first_save=not(self.append)
+        return(f)
+    
+    def write_block(self,f,block,stop):
+        """
+            Internal function :
+            Write a block of data in the opened file f (csv lines or hdf datasets).
+            Return False if an error occurred.
+        """
+        if len(block)==0:
+            if stop:
+                self.commit(f,final=True)
+            return True
+        try:
+            records=self.block_records(block)
+            if self.file_format=='hdf' and records is not None:
+                # the records are written without conversion in dataframe
+                if self.data_buffer!=None:
+                    self.data_buffer.append(records_to_dataframe(records))
+                t0=time.time()
+                self.append_hdf_records(f,records)
+                self.first_save=False
+                self.commit(f,final=stop)
+                self.write_latency=time.time()-t0
+                self.bytes_written+=records.nbytes
+                self.rows_written+=len(records)
+                return True
+            df=self.block_to_dataframe(block)
+            if self.data_buffer!=None:
+                self.data_buffer.append(df)
+            t0=time.time()
+            if self.file_format=='hdf':
+                self.append_hdf(f,df)
+                Nbytes=int(df.memory_usage(index=False).sum())
+            else:
+                output=df.to_csv(index=False,header=self.first_save).encode()
+                f.write(output)
+                f.flush()
+                Nbytes=len(output)
+            self.first_save=False
+            self.commit(f,final=stop)
+            self.write_latency=time.time()-t0
+            self.bytes_written+=Nbytes
+            self.rows_written+=len(df)
+            return True
+        except:
+            log.error('Error in writing data to {}'.format(self.file))
+            return False
+    
+    def open_file(self,file,append=True):
+        """
+            Internal function :
+            Open the file in append mode (or truncate it if append is False) using the 
+            compression format depending on the extension of the file ( ‘.gz’, ‘.bz2’, ‘.xz’, ...)
+        """
+        file_handler={'gz':gzip.open,'bz2':bz2.open,'xz':lzma.open}
+        extension=file.split('.')[-1]
+        mode='ab' if append else 'wb'
+        if extension in ('gz','bz2','xz'):
+            return(file_handler[extension](file,mode))
+        else:
+            return(open(file,mode))
+    
+    def put(self,data,checkpoint=None):
+        """
+            Put the data (dataframe or structured record) in the queue, using the policy
+            if the queue is full. checkpoint is saved in the journal when the data are written.
+        """
+        if checkpoint!=None:
+            data=(data,checkpoint)
+        self.queue_data(data)
+        if self.service!=None:
+            self.service.notify()
+    
+    def queue_data(self,data):
+        """
+            Internal function :
+            Put the data in the queue using the policy if the queue is full
+        """
+        if self.done.is_set():
+            # the file is closed (error in writing) : the data are lost
+            self.dropped+=1
+            return
+        if self.policy=='block':
+            if not(self.wait_put(data)):
+                self.dropped+=1
+            return
+        with self.lock:
+            # keep the order of the data while the spill file is not empty
+            if self.spill_pending>0:
+                self.write_spill(data)
+                return
+            try:
+                self.q.put_nowait(data)
+                return
+            except Full:
+                pass
+            if self.policy=='spill':
+                self.write_spill(data)
+            else:
+                self.dropped+=1
+    
+    def wait_put(self,data):
+        """
+            Internal function :
+            Put the data in the queue, waiting for a free place while the file is open.
+            Return False if the file has been closed.
+        """
+        while not(self.done.is_set()):
+            try:
+                self.q.put(data,timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+    
+    def write_spill(self,data):
+        """
+            Internal function :
+            Write the data at the end of the spill file (lock acquired)
+        """
+        if self.spill_file==None:
+            self.spill_file=tempfile.TemporaryFile(dir=self.spill_dir)
+        self.spill_file.seek(0,2)
+        pickle.dump(data,self.spill_file)
+        self.spill_pending+=1
+        self.spilled+=1
+        
+    def read_spill(self):
+        """
+            Internal function :
+            Return the first data of the spill file, raise Empty if there is no data
+        """
+        with self.lock:
+            if self.spill_pending==0:
+                raise Empty
+            self.spill_file.seek(self.spill_position)
+            data=pickle.load(self.spill_file)
+            self.spill_position=self.spill_file.tell()
+            self.spill_pending-=1
+            if self.spill_pending==0:
+                self.spill_file.seek(0)
+                self.spill_file.truncate()
+                self.spill_position=0
+            return(data)
+    
+    def get_item(self,q,timeout=None):
+        """
+            Internal function :
+            Return the next data from the queue, or from the spill file if the queue is empty.
+            Wait at most timeout (in s) if it is not None, then raise Empty.
+        """
+        try:
+            data=q.get_nowait()
             q.task_done()
+            return(data)
+        except Empty:
+            pass
+        try:
+            return(self.read_spill())
+        except Empty:
+            pass
+        data=q.get(timeout=timeout)
+        q.task_done()
+        return(data)
+    
+    @property
+    def queue_depth(self):
+        """
+            Number of data waiting to be saved
+        """
+        return(self.q.qsize()+self.spill_pending)
+    
+    def metrics(self):
+        """
+            Return a dict with the state of the saver
+        """
+        return({'queue_depth':self.queue_depth,'write_latency':self.write_latency,
+                'bytes_written':self.bytes_written,'rows_written':self.rows_written,
+                'dropped':self.dropped,'spilled':self.spilled})
+    
+    def commit(self,f,final=False):
+        """
+            Internal function :
+            Synchronize the file every fsync_every blocks (and at the end if final is True) 
+            and update the journal
+        """
+        if not(final):
+            self.Nblocks+=1
+        synchronize=(self.fsync_every>0 and (final or self.Nblocks%self.fsync_every==0))
+        if synchronize:
             try:
-                if first_save :
-                    df.to_csv(file,index=False,header=True,mode='a')
-                    first_save=False
-                else:
-                    df.to_csv(file,index=False,header=False,mode='a')
+                os.fsync(f.fileno())
             except:
-                break
+                pass
+        if self.journal!=None and self.checkpoint!=None and (self.fsync_every==0 or synchronize):
+            self.write_journal(self.file_position(f),synchronize)
+    
+    def file_position(self,f):
+        """
+            Internal function :
+            Return the size of the csv file or the number of rows of the hdf file
+        """
+        if hasattr(f,'attrs'):
+            if 'columns' in f.attrs:
+                return(f[f.attrs['columns'][0]].shape[0])
+            return(0)
+        return(os.fstat(f.fileno()).st_size)
+    
+    def write_journal(self,offset,synchronize=False):
+        """
+            Internal function :
+            Replace the journal file by the current state
+        """
+        state=dict(self.journal)
+        state['checkpoint']=self.checkpoint
+        state['offset']=int(offset)
+        temp_file=self.journal_file+'.tmp'
+        try:
+            with open(temp_file,'w') as f:
+                json.dump(state,f,default=lambda x: x.tolist() if hasattr(x,'tolist') else str(x))
+                if synchronize:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_file,self.journal_file)
+        except:
+            log.error('Error in writing the journal {}'.format(self.journal_file))
+        
+    def block_to_dataframe(self,block):
+        """
+            Internal function :
+            Convert a list of dataframes or structured records in one dataframe.
+            Successive records with the same layout are concatenated before the conversion.
+        """
+        frames=[]
+        records=[]
+        for data in block:
+            if isinstance(data,np.ndarray) and (len(records)==0 or data.dtype==records[0].dtype):
+                records.append(data)
+                continue
+            if len(records)>0:
+                frames.append(records_to_dataframe(np.concatenate(records)))
+                records=[]
+            if isinstance(data,np.ndarray):
+                records.append(data)
+            else:
+                frames.append(data)
+        if len(records)>0:
+            frames.append(records_to_dataframe(np.concatenate(records)))
+        if len(frames)==1:
+            return(frames[0])
+        return(pd.concat(frames,ignore_index=True))
+    
+    def block_records(self,block):
+        """
+            Internal function :
+            Return the concatenated records if the block contains only structured records
+            with the same layout, otherwise None
+        """
+        if not(all(isinstance(data,np.ndarray) and data.dtype==block[0].dtype for data in block)):
+            return None
+        return(np.concatenate(block))
+        
+    def get_block(self,q):
+        """
+            Internal function :
+            Wait for data in the queue 'q' and return (list of dataframes, stop).
+            In buffered mode, all the available data are taken from the queue until
+            buffer_size rows are received or flush_time is elapsed.
+            stop is True if 'stop' is received.
+            The checkpoint of the last data of the block is kept in self.checkpoint.
+        """
+        block=[]
+        Nrows=0
+        while True:
+            if self.buffered and len(block)>0:
+                timeout=self.flush_time-(time.time()-t0)
+                try:
+                    df=self.get_item(q,timeout=max(timeout,0))
+                except Empty:
+                    return((block,False))
+            else:
+                df=self.get_item(q)
+            if isinstance(df,tuple):
+                df,self.checkpoint=df
+            if not(isinstance(df,(pd.DataFrame,np.ndarray))):
+                return((block,True))
+            if len(block)==0:
+                t0=time.time()
+            block.append(df)
+            Nrows+=len(df)
+            if not(self.buffered) or Nrows>=self.buffer_size:
+                return((block,False))
+                
+    def hdf_column_name(self,column):
+        """
+            Internal function : name of the dataset associated to a column of the dataframe
+        """
+        if isinstance(column,tuple):
+            column='_'.join([str(x) for x in column])
+        return(str(column).replace('/','_'))
+        
+    def append_hdf(self,f,df):
+        """
+            Internal function : append the dataframe df to the datasets of the hdf file f.
+            The datasets are created with the columns of the first dataframe.
+        """
+        names=[self.hdf_column_name(column) for column in df.columns]
+        values=dict(zip(names,[df[column] for column in df.columns]))
+        if not('columns' in f.attrs):
+            for name in names:
+                if values[name].dtype.kind in 'biuf':
+                    dtype='float64'
+                else:
+                    dtype=h5py.string_dtype()
+                f.create_dataset(name,shape=(0,),maxshape=(None,),
+                                chunks=(self.chunk_size,),dtype=dtype)
+            f.attrs['columns']=names
+        if not(f.swmr_mode):
+            f.swmr_mode=True
+        N=len(df)
+        for name in f.attrs['columns']:
+            dset=f[name]
+            if dset.ndim==2:
+                # tabular data written as a 2D dataset by append_hdf_records
+                data=np.full((N,dset.shape[1]),np.nan)
+                for i,column in enumerate(vector_columns(name,dset.shape[1])):
+                    if column in values:
+                        data[:,i]=pd.to_numeric(values[column],errors='coerce').to_numpy(dtype='float64')
+                dset.resize(dset.shape[0]+N,axis=0)
+                dset[-N:]=data
+                dset.flush()
+                continue
+            if name in values:
+                if h5py.check_string_dtype(dset.dtype) != None:
+                    data=values[name].astype(str).to_numpy(dtype=object)
+                else:
+                    data=pd.to_numeric(values[name],errors='coerce').to_numpy(dtype='float64')
+            else:
+                data=np.full(N,np.nan)
+            N0=dset.shape[0]
+            dset.resize((N0+N,))
+            dset[N0:]=data
+            dset.flush()
+        
+    def append_hdf_records(self,f,records):
+        """
+            Internal function : append the structured records to the datasets of the hdf file f.
+            The datasets are created with the fields of the first records, the vector fields 
+            are written as 2D datasets (rows x samples) and read as the columns name_i.
+        """
+        fields={self.hdf_column_name(name):name for name in records.dtype.names}
+        if any(records.dtype[name].shape!=() and records.dtype[name].base.kind not in 'biuf' 
+               for name in records.dtype.names):
+            # tabular data which are not numbers
+            self.append_hdf(f,records_to_dataframe(records))
+            return
+        if 'columns' in f.attrs:
+            # datasets created with another layout
+            if not(all(name in fields and (f[name].ndim==1)==(records.dtype[fields[name]].shape==()) 
+                       for name in f.attrs['columns'])):
+                self.append_hdf(f,records_to_dataframe(records))
+                return
+        if not('columns' in f.attrs):
+            for name,field in fields.items():
+                dtype=records.dtype[field]
+                if dtype.shape!=():
+                    f.create_dataset(name,shape=(0,)+dtype.shape,maxshape=(None,)+dtype.shape,
+                                     chunks=(max(self.chunk_size//max(int(np.prod(dtype.shape)),1),1),)+dtype.shape,
+                                     dtype='float64')
+                elif dtype.kind in 'biuf':
+                    f.create_dataset(name,shape=(0,),maxshape=(None,),chunks=(self.chunk_size,),dtype='float64')
+                else:
+                    f.create_dataset(name,shape=(0,),maxshape=(None,),chunks=(self.chunk_size,),
+                                     dtype=h5py.string_dtype())
+            f.attrs['columns']=list(fields.keys())
+        if not(f.swmr_mode):
+            f.swmr_mode=True
+        N=len(records)
+        for name in f.attrs['columns']:
+            dset=f[name]
+            data=records[fields[name]]
+            if h5py.check_string_dtype(dset.dtype) != None:
+                data=data.astype(str).astype(object)
+            elif dset.shape[1:]!=data.shape[1:]:
+                # vector of another length : completed with NaN or cut
+                block=np.full((N,)+dset.shape[1:],np.nan)
+                M=min(dset.shape[1],data.shape[1])
+                block[:,:M]=data[:,:M]
+                data=block
+            elif data.dtype.kind=='O':
+                data=pd.to_numeric(data,errors='coerce').astype('float64')
+            else:
+                data=data.astype('float64')
+            dset.resize(dset.shape[0]+N,axis=0)
+            dset[-N:]=data
+            dset.flush()
         
     def close(self):
         """
             End the thread
         """
-        self.q.put('stop')
+        if self.done.is_set():
+            return
+        if self.policy=='spill':
+            self.queue_data('stop')
+        else:
+            self.wait_put('stop')
+        if self.service!=None:
+            self.service.notify()
             
-class LinSweep(object):
+def log_exception(future):
+    """
+        Callback of the futures of the worker threads logging the error of the task
+    """
+    error=future.exception()
+    if error is not None:
+        log.error('Error in worker thread',exc_info=error)
+
+class Stepper_State(object):
+    """
+        Base class of the steppers. The attribute busy is backed by the Event idle 
+        (set when the stepper is not moving) so that the loop driving the stepper 
+        can wait for the end of a step with wait_idle instead of polling busy. 
+        The subclasses define the Events should_stop and should_pause.
+        The steps are done in a single worker thread owned by the stepper (see submit), 
+        which is stopped by shutdown when the stepper has finished.
+    """
+    def submit(self,function,*args):
+        """
+            Run function(*args) in the worker thread of the stepper, return a future
+        """
+        executor=getattr(self,'executor',None)
+        if executor==None:
+            executor=self.executor=ThreadPoolExecutor(max_workers=1,thread_name_prefix=self.type+'_worker')
+        future=executor.submit(function,*args)
+        future.add_done_callback(log_exception)
+        return(future)
+        
+    def shutdown(self):
+        """
+            Stop the worker thread of the stepper once the current step is done, 
+            a new one is started by the next submit
+        """
+        executor=getattr(self,'executor',None)
+        if executor!=None:
+            executor.shutdown(wait=True)
+            self.executor=None
+        
+    @property
+    def busy(self):
+        return(not(self.idle.is_set()))
+        
+    @busy.setter
+    def busy(self,state):
+        if state:
+            self.idle.clear()
+        else:
+            self.idle.set()
+            
+    def wait_idle(self,timeout=None):
+        """
+            Wait the end of the current step (at most timeout in s), return True if the stepper is idle
+        """
+        return(self.idle.wait(timeout))
+        
+    def wait_function(self,wait):
+        """
+            function used for waiting while checking pause and stop
+        """
+        if self.should_stop.wait(wait):
+            return
+        while self.should_pause.is_set():
+            if self.should_stop.wait(0.01):
+                break
+            
+class LinSweep(Stepper_State):
     """
         SYNTAX : LinSweep(device,start,stop,rate,N)
         
@@ -373,6 +1305,7 @@ class LinSweep(object):
         self.N=N
         self.rate=rate
         self.kwargs=kwargs
+        self.idle=Event()
         self.busy=False
         self.finished=False
         self.init_wait=init_wait
@@ -383,6 +1316,9 @@ class LinSweep(object):
         else:
             self.extra_rate=extra_rate
         self.mode=mode
+        # index of the first value for the next run only (used to resume a sweep)
+        self.resume_index=None
+        self.index_offset=0
         # define the Event used for pause and stop
         self.should_stop=self.local_sweep.should_stop
         self.should_pause=self.local_sweep.should_pause
@@ -410,6 +1346,13 @@ class LinSweep(object):
             Return the current value by reading the instrument
         """
         return(self.local_sweep.get_value())
+        
+    def shutdown(self):
+        """
+            Stop the worker threads of the stepper and of its sweep
+        """
+        super().shutdown()
+        self.local_sweep.close()
     
     @property 
     def value(self):
@@ -418,32 +1361,21 @@ class LinSweep(object):
     @property
     def interface_value(self):
         return(self.get_value())
-        
-    def wait_function(self,wait):
+    
+    @property
+    def sweep_index(self):
         """
-            function used for waiting while checking pause and stop
+            Index of the current value in the full list of values of the run
         """
-        t0=time.time()
-        while (time.time()-t0) < wait:
-            if self.should_stop.is_set():
-                break
-            else: 
-                time.sleep(0.01)
-        while self.should_pause.is_set():
-            if self.should_stop.is_set():
-                break
-            else: 
-                time.sleep(0.01)
-                
-    def wait_end_sweep(self,local_sweep_thread):
+        return(self.index+self.index_offset)
+        
+    def wait_end_sweep(self,local_sweep_future):
         """
             function used for waiting the end of the sweep while checking stop
         """
-        while local_sweep_thread.is_alive():
+        while not(self.local_sweep.done.wait(0.05)):
             if self.should_stop.is_set():
                 break
-            else: 
-                time.sleep(0.01)
     
     def generate_values(self,update_forward=True):    
         if self.mode==None:
@@ -462,6 +1394,13 @@ class LinSweep(object):
         
     def initialize(self):
         self.sweep_values,self.index_values=self.generate_values()
+        # start at resume_index for this run only
+        self.index_offset=0
+        if self.resume_index!=None:
+            self.sweep_values=self.sweep_values[self.resume_index:]
+            self.index_values=self.index_values[self.resume_index:]
+            self.index_offset=self.resume_index
+            self.resume_index=None
         self.Nvalues=len(self.sweep_values)-1
         self.current_value=self.get_value()
         self.current_index=self.current_value
@@ -494,16 +1433,16 @@ class LinSweep(object):
         self.current_index=self.index_values[0]
         self.index=0
         self.progress=0
-        self.finished=False
+        self.finished=(self.Nvalues==0)
         self.wait_function(self.init_wait)
         self.busy=False   
     
     def set_initial_value(self):
         """"
-            Set the current value using another thread
+            Set the current value in the worker thread
         """
-        thread_work_set_initial_value = Thread(name='Initial_Value_setter_thread',target=self.work_set_initial_value)     
-        thread_work_set_initial_value.start()
+        self.busy=True
+        self.submit(self.work_set_initial_value)
 
     def work_set_value(self,value):
         """"
@@ -520,10 +1459,10 @@ class LinSweep(object):
     
     def set_current_value(self,value):
         """"
-            Set the current value using another thread
+            Set the current value in the worker thread
         """
-        thread_work_set_value = Thread(name='Value_setter_thread',target=self.work_set_value,args=(value,))    
-        thread_work_set_value.start()
+        self.busy=True
+        self.submit(self.work_set_value,value)
         
     def work_set_back_value(self):
         """"
@@ -536,10 +1475,10 @@ class LinSweep(object):
     
     def set_back_value(self):
         """"
-            Set the current value to the initial if back option is True using another thread
+            Set the current value to the initial if back option is True in the worker thread
         """
-        thread_work_set_back_value = Thread(name='Back_Value_setter_thread',target=self.work_set_back_value)     
-        thread_work_set_back_value.start()
+        self.busy=True
+        self.submit(self.work_set_back_value)
     
     def initial_step(self):
         """
@@ -583,6 +1522,16 @@ class LinSweep(object):
         return('{} {} {} {} {} {} {}'.format(self.type,self.name,
             self.start,self.end,self.rate,self.N,kwargs_string))
             
+    def generate_kwargs(self):
+        """
+            Return the arguments (except the device and the name) used to create the stepper
+        """
+        kwargs={'start':self.start,'stop':self.end,'rate':self.rate,'N':self.N,
+                'init_wait':self.init_wait,'back':self.back,'extra_rate':self.extra_rate,
+                'mode':self.mode,'init_step':self.init_step,'tolerance':self.tolerance}
+        kwargs.update(self.kwargs)
+        return(kwargs)
+        
     def show(self):
         """
             Plot the sweep values
@@ -596,7 +1545,7 @@ class LinSweep(object):
         ax.grid(True)
         plt.show()
         
-class GenericSteps(object):
+class GenericSteps(Stepper_State):
     """
         Generic class used for LinSteps,LogSteps and ArraySteps 
     """
@@ -624,10 +1573,14 @@ class GenericSteps(object):
         self.index=0
         self.progress=-1
         self.forward=True
+        self.idle=Event()
         self.busy=False
         self.finished=False
         self.back=False
         self.mode=None
+        # index of the first value for the next run only (used to resume a sweep)
+        self.resume_index=None
+        self.index_offset=0
         # define the Event used for pause and stop
         self.should_stop=Event()
         self.should_pause=Event()
@@ -643,22 +1596,6 @@ class GenericSteps(object):
         # condition to check to continue sweep
         self.condition=condition
                   
-    def wait_function(self,wait):
-        """
-            function used for waiting while checking pause and stop
-        """
-        t0=time.time()
-        while (time.time()-t0) < wait:
-            if self.should_stop.is_set():
-                break
-            else: 
-                time.sleep(0.01)
-        while self.should_pause.is_set():
-            if self.should_stop.is_set():
-                break
-            else: 
-                time.sleep(0.01)
-    
     def set_value(self,value):
         """"
             Set the device to the value value
@@ -678,6 +1615,13 @@ class GenericSteps(object):
     @property
     def index_value(self):
         return(self.get_value())
+    
+    @property
+    def sweep_index(self):
+        """
+            Index of the current value in the full list of values of the run
+        """
+        return(self.index+self.index_offset)
         
     def pause(self,state):
         if state==True:
@@ -701,6 +1645,13 @@ class GenericSteps(object):
             Update also the infos that can be sent to the interface.
         """
         self.sweep_values,self.index_values=self.generate_values()
+        # start at resume_index for this run only
+        self.index_offset=0
+        if self.resume_index!=None:
+            self.sweep_values=self.sweep_values[self.resume_index:]
+            self.index_values=self.index_values[self.resume_index:]
+            self.index_offset=self.resume_index
+            self.resume_index=None
         self.Nvalues=len(self.sweep_values)-1
         self.current_value=self.get_value()
         self.current_index=self.current_value
@@ -732,16 +1683,16 @@ class GenericSteps(object):
         self.current_index=self.index_values[0]
         self.index=0
         self.progress=0
-        self.finished=False
+        self.finished=(self.Nvalues==0)
         self.wait_function(self.wait+self.init_wait)
         self.busy=False   
     
     def set_initial_value(self):
         """"
-            Set the current value using another thread
+            Set the current value in the worker thread
         """
-        thread_work_set_initial_value = Thread(name='Initial_Value_setter_thread',target=self.work_set_initial_value)     
-        thread_work_set_initial_value.start()
+        self.busy=True
+        self.submit(self.work_set_initial_value)
 
     def work_set_value(self,value):
         """"
@@ -764,10 +1715,10 @@ class GenericSteps(object):
     
     def set_current_value(self,value):
         """"
-            Set the current value using another thread
+            Set the current value in the worker thread
         """
-        thread_work_set_value = Thread(name='Value_setter_thread',target=self.work_set_value,args=(value,))    
-        thread_work_set_value.start()
+        self.busy=True
+        self.submit(self.work_set_value,value)
     
     def initial_step(self):
         """
@@ -890,6 +1841,15 @@ class LinSteps(GenericSteps):
         return('{} {} {} {} {} {} {}'.format(self.type,self.name,
             self.start,self.end,self.N,self.wait,kwargs_string))       
         
+    def generate_kwargs(self):
+        """
+            Return the arguments (except the device and the name) used to create the stepper
+        """
+        kwargs={'start':self.start,'stop':self.end,'N':self.N,'wait':self.wait,
+                'back':self.back,'init_wait':self.init_wait,'mode':self.mode}
+        kwargs.update(self.kwargs)
+        return(kwargs)
+        
 class LogSteps(GenericSteps):
     """
         SYNTAX : LogSteps(device,start,stop,N,wait)
@@ -964,6 +1924,15 @@ class LogSteps(GenericSteps):
         return('{} {} {} {} {} {} {}'.format(self.type,self.name,
             self.start,self.end,self.N,self.wait,kwargs_string))
         
+    def generate_kwargs(self):
+        """
+            Return the arguments (except the device and the name) used to create the stepper
+        """
+        kwargs={'start':self.start,'stop':self.end,'N':self.N,'wait':self.wait,
+                'back':self.back,'init_wait':self.init_wait,'mode':self.mode}
+        kwargs.update(self.kwargs)
+        return(kwargs)
+        
 class ArraySteps(GenericSteps):
     """
         SYNTAX : ArraySteps(device,array,wait)
@@ -1042,6 +2011,172 @@ class ArraySteps(GenericSteps):
         return('{} {} {} {} {} {} {}'.format(self.type,self.name,
             self.array[0],len(self.array),self.array[-1],self.wait,kwargs_string))
 
+    def generate_kwargs(self):
+        """
+            Return the arguments (except the device and the name) used to create the stepper
+        """
+        kwargs={'array':self.array.tolist(),'wait':self.wait,
+                'back':self.back,'init_wait':self.init_wait,'mode':self.mode}
+        kwargs.update(self.kwargs)
+        return(kwargs)
+
+class AdaptiveSteps(GenericSteps):
+    """
+        SYNTAX : AdaptiveSteps(device,start,stop,N,wait,column)
+        
+        Change the value of the device defined in 'device' from start to end, starting with N evenly spaced points.
+        When the last point of the list is set, new points are added at the middle of the intervals where the 
+        measured quantity 'column' varies the most (variation and curvature in units of the sweep and data ranges), 
+        until max_points points are measured or no interval can be refined. The intervals where the data 
+        do not change and the intervals ending on a missing data (NaN) are not refined.
+        After setting each value, the system wait a time 'wait' (in s).
+        The data are saved in the order of acquisition with the values of the device : sort them by setpoint to plot them.
+        If a name is provided it will be used as a label, otherwise the name of the device is used.
+        The values of the sweep are checked to be compatible with the device.
+        This sweep can be used with the Experiment function multisweep (not with the options journal and pipeline), 
+        which provides the measured data to the method observe.
+        
+        The device can be indicated in different forms :
+            - device, if device belongs to the class Alias.
+            - [instru,'attribute'] to move instru.attribute.
+            - (instru,'attribute') to move instru.attribute.
+            
+        OPTIONS :
+            - max_points : total number of points of the sweep. Default : 4*N
+            - batch : maximal number of points added at each refinement. Default : N
+            - min_step : the intervals smaller than 2*min_step are not refined. Default : None
+            - max_step : the intervals larger than max_step are refined first. Default : None
+            - back : If True, return to the start value when finished. Default : False.
+            - init_wait : value of the time waited at the beginning of the sweep. Default : 0
+                      
+        EXAMPLES :
+        sweep0=AdaptiveSteps([test,'dac'],0,1,21,0.1,'I',max_points=200,min_step=1e-3,name='Vgate(V)') 
+        sweep1=AdaptiveSteps(Vgate,0,1,11,0.5,'G',back=True)  # if Vgate is defined as an Alias
+    """
+    def __init__(self,device,start,stop,N,wait,column,name=None,max_points=None,batch=None,
+                 min_step=None,max_step=None,back=False,init_wait=0,**kwargs):
+        super().__init__(device,name=name)
+        self.type='AdaptiveSteps'
+        self.start=start
+        self.end=stop
+        self.N=N
+        self.wait=wait
+        self.column=column
+        self.max_points=4*N if max_points==None else max_points
+        self.batch=N if batch==None else batch
+        self.min_step=min_step
+        self.max_step=max_step
+        self.kwargs=kwargs
+        self.init_wait=init_wait
+        self.back=back
+        # measured values of column for each setpoint
+        self.observed={}
+        # check the value of the sweep, the added points are between start and stop
+        self.sweep_values,self.index_values=self.generate_values()
+        if not(self.checking_values()):
+            raise(ExperimentError('Sweep values out of range'))
+        # define the values used for the interface
+        self.interface_start=self.start
+        self.interface_end=self.end
+        
+    def generate_values(self):
+        list_values=np.linspace(self.start,self.end,self.N)
+        return((list_values,list_values))
+        
+    def initialize(self):
+        super().initialize()
+        self.observed={}
+        
+    def observe(self,df):
+        """
+            Record the value of column measured at the current setpoint (dataframe or structured record).
+            Called by multisweep after each measurement.
+        """
+        try:
+            value=float(np.mean(df[self.column]))
+        except (KeyError,ValueError):
+            return
+        self.observed.setdefault(self.current_value,[]).append(value)
+        
+    def mean_value(self,setpoint):
+        """
+            Mean of the finite values measured at setpoint (NaN if there is none)
+        """
+        values=np.array(self.observed[setpoint],dtype=float)
+        values=values[np.isfinite(values)]
+        return(values.mean() if len(values)>0 else np.nan)
+        
+    def refine(self):
+        """
+            Add new points at the end of the list of values, return the number of points added
+        """
+        budget=min(self.batch,self.max_points-len(self.sweep_values))
+        if budget<=0 or len(self.observed)<2:
+            return(0)
+        x=np.array(sorted(self.observed))
+        y=np.array([self.mean_value(x_i) for x_i in x])
+        dx=np.diff(x)
+        finite=np.isfinite(y)
+        xs=x/(abs(self.end-self.start) or 1.0)
+        ys=y/((np.nanmax(y)-np.nanmin(y) if np.any(finite) else 0.0) or 1.0)
+        # variation : change of the data weighted by the length of the interval (in units 
+        # of the ranges), the flat intervals are not refined
+        dys=np.abs(np.diff(ys))
+        loss=dys*np.hypot(np.diff(xs),dys)
+        # curvature : area of the triangle of 3 consecutive points, given to its 2 intervals
+        if len(x)>2:
+            area=0.5*np.abs((xs[1:-1]-xs[:-2])*(ys[2:]-ys[:-2])-(xs[2:]-xs[:-2])*(ys[1:-1]-ys[:-2]))
+            area=np.nan_to_num(area,nan=0.0)
+            loss[:-1]+=area
+            loss[1:]+=area
+        # the intervals with a missing data (NaN) are not refined
+        loss[~(finite[:-1] & finite[1:])]=-1
+        if self.max_step!=None:
+            loss[dx>self.max_step]+=np.inf
+        if self.min_step!=None:
+            loss[dx<2*self.min_step]=-1
+        # the intervals containing a point not measured yet are not refined
+        for value in self.sweep_values[self.index:]:
+            i=np.searchsorted(x,value)
+            if 0<i<len(x):
+                loss[i-1]=-1
+        selected=[i for i in np.argsort(loss)[::-1][:budget] if loss[i]>0]
+        new_values=np.sort(x[selected]+dx[selected]/2)
+        if self.end<self.start:
+            new_values=new_values[::-1]
+        self.sweep_values=np.append(self.sweep_values,new_values)
+        self.index_values=np.append(self.index_values,new_values)
+        self.Nvalues=len(self.sweep_values)-1
+        return(len(new_values))
+        
+    def work_set_value(self,value):
+        """"
+            Refine the sweep when the last point of the list is set, then set the current value of the instrument
+        """
+        if self.index==self.Nvalues and not(self.finished):
+            self.refine()
+        super().work_set_value(value)
+        
+    @property
+    def interface_value(self):
+        return(self.get_value())
+        
+    def generate_info(self):
+        kwargs_string='init_wait={},back={},max_points={},batch={},min_step={},max_step={}'.format(
+            self.init_wait,self.back,self.max_points,self.batch,self.min_step,self.max_step)
+        return('{} {} {} {} {} {} {} {}'.format(self.type,self.name,
+            self.start,self.end,self.N,self.wait,self.column,kwargs_string))
+        
+    def generate_kwargs(self):
+        """
+            Return the arguments (except the device and the name) used to create the stepper
+        """
+        kwargs={'start':self.start,'stop':self.end,'N':self.N,'wait':self.wait,'column':self.column,
+                'max_points':self.max_points,'batch':self.batch,'min_step':self.min_step,
+                'max_step':self.max_step,'back':self.back,'init_wait':self.init_wait}
+        kwargs.update(self.kwargs)
+        return(kwargs)
+
 def convert_to_np_array(input):
     '''
         Convert a string into a numpy array by finding all the float numbers
@@ -1049,7 +2184,7 @@ def convert_to_np_array(input):
     treat=re.findall(r'([+-]?\d+(?:\.\d+)?(?:[eE][+-]\d+)?)', input)
     return(np.array(list(map(float,treat))))
     
-class FlySweep(object):
+class FlySweep(Stepper_State):
     """
         SYNTAX : FlySweep(device,start,stop,rate,N)
         
@@ -1106,6 +2241,7 @@ class FlySweep(object):
         self.time_to_wait=abs(self.end-self.start)/((N-1)*self.rate)
         self.time_of_sweep=abs(self.end-self.start)/(self.rate)
         self.kwargs=kwargs
+        self.idle=Event()
         self.busy=False
         self.finished=False
         self.init_wait=init_wait
@@ -1143,6 +2279,13 @@ class FlySweep(object):
             Return the current value by reading the instrument
         """
         return(self.local_sweep.get_value())
+        
+    def shutdown(self):
+        """
+            Stop the worker threads of the stepper and of its sweep
+        """
+        super().shutdown()
+        self.local_sweep.close()
     
     @property 
     def value(self):
@@ -1152,31 +2295,13 @@ class FlySweep(object):
     def interface_value(self):
         return(self.get_value())
         
-    def wait_function(self,wait):
-        """
-            function used for waiting while checking pause and stop
-        """
-        t0=time.time()
-        while (time.time()-t0) < wait:
-            if self.should_stop.is_set():
-                break
-            else: 
-                time.sleep(0.01)
-        while self.should_pause.is_set():
-            if self.should_stop.is_set():
-                break
-            else: 
-                time.sleep(0.01)
-                
-    def wait_end_sweep(self,local_sweep_thread):
+    def wait_end_sweep(self,local_sweep_future):
         """
             function used for waiting the end of the sweep while checking stop
         """
-        while local_sweep_thread.is_alive():
+        while not(self.local_sweep.done.wait(0.05)):
             if self.should_stop.is_set():
                 break
-            else: 
-                time.sleep(0.01)
     
     def generate_values(self,update_forward=True):    
         if self.mode==None:
@@ -1233,10 +2358,10 @@ class FlySweep(object):
     
     def set_initial_value(self):
         """"
-            Set the current value using another thread
+            Set the current value in the worker thread
         """
-        thread_work_set_initial_value = Thread(name='Initial_Value_setter_thread',target=self.work_set_initial_value)     
-        thread_work_set_initial_value.start()
+        self.busy=True
+        self.submit(self.work_set_initial_value)
 
     def work_handle_sweep(self):
         """"
@@ -1245,7 +2370,7 @@ class FlySweep(object):
         self.busy=True
         if self.index==0:
             # start the global sweep
-            self.local_sweep_thread=self.local_sweep.sweep(self.sweep_values[0],self.sweep_values[1],self.rate)
+            self.local_sweep_future=self.local_sweep.sweep(self.sweep_values[0],self.sweep_values[1],self.rate)
             self.index=1
             # wait the time before taking a measurement
             self.wait_function(self.time_to_wait)
@@ -1255,9 +2380,9 @@ class FlySweep(object):
         self.current_value=self.value
         self.current_index=self.current_value
         self.progress=(self.current_value-self.start)/(self.end-self.start)
-        if not(self.local_sweep_thread.is_alive()):
+        if self.local_sweep_future.done():
             if self.mode=='updn' and self.sweep_pass==0:
-                self.local_sweep_thread=self.local_sweep.sweep(self.sweep_values[1],self.sweep_values[2],self.rate)
+                self.local_sweep_future=self.local_sweep.sweep(self.sweep_values[1],self.sweep_values[2],self.rate)
                 self.sweep_pass=1
             else:
                 self.finished=True
@@ -1265,10 +2390,10 @@ class FlySweep(object):
     
     def handle_sweep(self):
         """"
-            Set the current value using another thread
+            Set the current value in the worker thread
         """
-        thread_work_handle_sweep = Thread(name='Handle_sweep_thread',target=self.work_handle_sweep,args=())    
-        thread_work_handle_sweep.start()
+        self.busy=True
+        self.submit(self.work_handle_sweep)
         
     def work_set_back_value(self):
         """"
@@ -1281,10 +2406,10 @@ class FlySweep(object):
     
     def set_back_value(self):
         """"
-            Set the current value to the initial if back option is True using another thread
+            Set the current value to the initial if back option is True in the worker thread
         """
-        thread_work_set_back_value = Thread(name='Back_Value_setter_thread',target=self.work_set_back_value)     
-        thread_work_set_back_value.start()
+        self.busy=True
+        self.submit(self.work_set_back_value)
     
     def initial_step(self):
         """